@@ -22,14 +22,16 @@ function calculateCalories(exerciseType, reps, duration, profile) {
   const baseCaloriesPerRep = {
     pushup: 0.35,
     squat: 0.32,
-    situp: 0.25
+    situp: 0.25,
+    lunge: 0.3
   };
 
   // MET values for exercises (moderate intensity)
   const metValues = {
     pushup: 8.0,  // Vigorous calisthenics
     squat: 5.5,   // Moderate calisthenics
-    situp: 4.0    // Light calisthenics
+    situp: 4.0,   // Light calisthenics
+    lunge: 4.0    // Light calisthenics
   };
 
   let calories = reps * baseCaloriesPerRep[exerciseType];
@@ -76,7 +78,7 @@ function calculateCalories(exerciseType, reps, duration, profile) {
  * Save a new workout
  */
 router.post('/', [
-  body('exerciseType').isIn(['pushup', 'squat', 'situp']).withMessage('Invalid exercise type'),
+  body('exerciseType').isIn(['pushup', 'squat', 'situp', 'lunge']).withMessage('Invalid exercise type'),
   body('reps').isInt({ min: 0 }).withMessage('Reps must be a positive integer'),
   body('caloriesBurned').isFloat({ min: 0 }).optional(),
   body('duration').isInt({ min: 0 }).optional(),
@@ -129,7 +131,7 @@ router.post('/', [
 router.get('/history', [
   query('limit').optional().isInt({ min: 1, max: 100 }),
   query('offset').optional().isInt({ min: 0 }),
-  query('exerciseType').optional().isIn(['pushup', 'squat', 'situp'])
+  query('exerciseType').optional().isIn(['pushup', 'squat', 'situp', 'lunge'])
 ], async (req, res) => {
   const errors = validationResult(req);
   if (!errors.isEmpty()) {
@@ -223,7 +225,8 @@ router.get('/stats', async (req, res) => {
       byExercise: {
         pushup: { count: 0, reps: 0, calories: 0 },
         squat: { count: 0, reps: 0, calories: 0 },
-        situp: { count: 0, reps: 0, calories: 0 }
+        situp: { count: 0, reps: 0, calories: 0 },
+        lunge: { count: 0, reps: 0, calories: 0 }
       }
     };
 
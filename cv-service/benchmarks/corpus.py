@@ -0,0 +1,204 @@
+"""
+Benchmark Corpus Module
+Generates the synthetic frames and landmark sequences the benchmarks replay.
+
+Nothing is downloaded: frames are drawn with OpenCV (a flat-shaded
+figure squatting in front of a plain wall, which MediaPipe detects) and
+landmark sequences are built from joint angles that sweep through the
+rep thresholds of each exercise detector. The corpus is deterministic,
+so runs on different commits replay identical input.
+
+Run this file to (re)write the corpus to benchmarks/corpus/.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from landmark_frame import LANDMARK_INDEX, NUM_LANDMARKS  # noqa: E402
+from synthetic_frame import draw_figure  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Frame sizes (width, height) of the JPEG corpus
+FRAME_SIZES = ((640, 480), (1280, 720))
+FRAMES_PER_SIZE = 60
+JPEG_QUALITY = 85
+
+# Frames per landmark sequence, about a minute at 10 FPS
+SEQUENCE_FRAMES = 600
+# Frames per rep cycle (3 s at 10 FPS)
+REP_PERIOD = 30
+
+# Joint angle sweep (low, high) per exercise, in degrees, spanning the
+# detector thresholds: pushup elbow 55/70, squat knee 100/160, situp hip 80/120
+ANGLE_RANGES = {
+    'pushup': (40.0, 85.0),
+    'squat': (80.0, 175.0),
+    'situp': (60.0, 150.0),
+}
+
+
+def _rep_phase(frame, period=REP_PERIOD):
+    """0..1..0 cosine over one rep cycle."""
+    return (1 - math.cos(2 * math.pi * frame / period)) / 2
+
+
+def make_frames(width, height, count=FRAMES_PER_SIZE, quality=JPEG_QUALITY):
+    """
+    Encode a squatting figure as a sequence of JPEG frames.
+
+    Returns:
+        list: JPEG bytes, one per frame
+    """
+    frames = []
+    for i in range(count):
+        image = draw_figure(width, height, _rep_phase(i))
+        success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            raise RuntimeError(f'Could not encode a {width}x{height} frame')
+        frames.append(buffer.tobytes())
+    return frames
+
+
+def _standing_pose():
+    """Side-view standing skeleton as a (33, 4) array of x, y, z, visibility."""
+    points = {
+        'NOSE': (0.50, 0.12), 'LEFT_EAR': (0.49, 0.13), 'RIGHT_EAR': (0.51, 0.13),
+        'LEFT_SHOULDER': (0.50, 0.25), 'RIGHT_SHOULDER': (0.51, 0.25),
+        'LEFT_ELBOW': (0.50, 0.40), 'RIGHT_ELBOW': (0.51, 0.40),
+        'LEFT_WRIST': (0.50, 0.53), 'RIGHT_WRIST': (0.51, 0.53),
+        'LEFT_HIP': (0.50, 0.55), 'RIGHT_HIP': (0.51, 0.55),
+        'LEFT_KNEE': (0.50, 0.72), 'RIGHT_KNEE': (0.51, 0.72),
+        'LEFT_ANKLE': (0.50, 0.90), 'RIGHT_ANKLE': (0.51, 0.90),
+    }
+    pose = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    pose[:, :2] = 0.5
+    pose[:, 3] = 0.95
+    for name, (x, y) in points.items():
+        pose[LANDMARK_INDEX[name], :2] = (x, y)
+    return pose
+
+
+def _bend(pose, a, b, c, angle, direction):
+    """Place a and c around joint b so the angle at b is `angle` degrees."""
+    base = pose[LANDMARK_INDEX[b], :2]
+    length_a = np.linalg.norm(pose[LANDMARK_INDEX[a], :2] - base)
+    length_c = np.linalg.norm(pose[LANDMARK_INDEX[c], :2] - base)
+    first = math.radians(direction)
+    second = first + math.radians(angle)
+    pose[LANDMARK_INDEX[a], :2] = base + length_a * np.array((math.cos(first), math.sin(first)))
+    pose[LANDMARK_INDEX[c], :2] = base + length_c * np.array((math.cos(second), math.sin(second)))
+
+
+def make_sequence(exercise_type, frames=SEQUENCE_FRAMES, seed=0):
+    """
+    Build a landmark sequence of an exercise, one rep per REP_PERIOD frames.
+
+    The counted joint sweeps through ANGLE_RANGES with a little
+    per-frame jitter; a few frames lose visibility as they would when
+    the person leaves the frame.
+
+    Returns:
+        np.ndarray: (frames, 33, 4) float32 array
+    """
+    low, high = ANGLE_RANGES[exercise_type]
+    rng = np.random.default_rng(seed)
+    sequence = np.empty((frames, NUM_LANDMARKS, 4), dtype=np.float32)
+    base = _standing_pose()
+
+    for i in range(frames):
+        pose = base.copy()
+        angle = high - (high - low) * _rep_phase(i) + rng.normal(0.0, 1.5)
+        for side in ('LEFT', 'RIGHT'):
+            if exercise_type == 'pushup':
+                _bend(pose, f'{side}_SHOULDER', f'{side}_ELBOW', f'{side}_WRIST', angle, -90)
+            elif exercise_type == 'squat':
+                _bend(pose, f'{side}_HIP', f'{side}_KNEE', f'{side}_ANKLE', angle, -90)
+            else:
+                _bend(pose, f'{side}_SHOULDER', f'{side}_HIP', f'{side}_KNEE', angle, -90)
+        pose[:, :2] += rng.normal(0.0, 0.002, size=(NUM_LANDMARKS, 2))
+        if rng.random() < 0.02:
+            pose[:, 3] = 0.1
+        sequence[i] = pose
+    return sequence
+
+
+def write_corpus(directory=CORPUS_DIR):
+    """
+    Write the whole corpus to a directory.
+
+    Layout: frames/<width>x<height>/NNNN.jpg, sequences/<exercise>.npy
+    and manifest.json describing both.
+
+    Returns:
+        dict: The manifest
+    """
+    manifest = {'frames': {}, 'sequences': {}, 'rep_period': REP_PERIOD}
+
+    for width, height in FRAME_SIZES:
+        name = f'{width}x{height}'
+        frame_dir = os.path.join(directory, 'frames', name)
+        os.makedirs(frame_dir, exist_ok=True)
+        frames = make_frames(width, height)
+        for i, data in enumerate(frames):
+            with open(os.path.join(frame_dir, f'{i:04d}.jpg'), 'wb') as f:
+                f.write(data)
+        manifest['frames'][name] = len(frames)
+
+    sequence_dir = os.path.join(directory, 'sequences')
+    os.makedirs(sequence_dir, exist_ok=True)
+    for seed, exercise_type in enumerate(sorted(ANGLE_RANGES)):
+        sequence = make_sequence(exercise_type, seed=seed)
+        np.save(os.path.join(sequence_dir, f'{exercise_type}.npy'), sequence)
+        manifest['sequences'][exercise_type] = len(sequence)
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_corpus(directory=CORPUS_DIR):
+    """
+    Load the corpus, writing it first if it does not exist yet.
+
+    Frames and sequences recorded locally can be dropped into the same
+    layout (and listed in manifest.json) to benchmark real footage.
+
+    Returns:
+        tuple: ({size: [jpeg bytes]}, {exercise_type: (frames, 33, 4) array})
+    """
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        write_corpus(directory)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    frames = {}
+    for name, count in manifest['frames'].items():
+        frame_dir = os.path.join(directory, 'frames', name)
+        frames[name] = []
+        for i in range(count):
+            with open(os.path.join(frame_dir, f'{i:04d}.jpg'), 'rb') as f:
+                frames[name].append(f.read())
+
+    sequences = {
+        exercise_type: np.load(os.path.join(directory, 'sequences', f'{exercise_type}.npy'))
+        for exercise_type in manifest['sequences']
+    }
+    return frames, sequences
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write the benchmark corpus')
+    parser.add_argument('--output', default=CORPUS_DIR, help='Corpus directory')
+    args = parser.parse_args()
+    written = write_corpus(args.output)
+    print(json.dumps(written, indent=2))
@@ -0,0 +1,247 @@
+"""
+Hot Path Benchmarks
+Times each stage of the cv-service frame pipeline on the benchmark corpus.
+
+Every stage runs in isolation on the same input so a regression can be
+traced to the stage that caused it:
+
+    decode_image     base64 payload to BGR image (reduced-scale JPEG decode)
+    pose_detect      PoseDetector.detect on a tracked frame sequence
+    get_landmark     landmark lookup with the visibility check
+    calculate_angle  one joint angle from three landmarks
+    detector         ExerciseDetector.detect per exercise type
+    annotate         drawing the landmark overlay
+    encode           JPEG data URL and landmark payload encoding
+
+Each result reports p50/p99 latency, wall-clock frames per second and
+frames per second per core (frames per CPU second of the process, so
+MediaPipe's own threads are counted). Results are written as JSON; pass
+--baseline with an earlier result file to fail on regressions.
+"""
+
+import argparse
+import base64
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..', 'src'))
+
+from corpus import load_corpus  # noqa: E402
+from exercise_detectors import get_detector  # noqa: E402
+from frame_decode import decode_frame  # noqa: E402
+from frame_output import encode_jpeg, encode_landmarks, render_overlay  # noqa: E402
+from landmark_frame import LandmarkFrame, calculate_angle  # noqa: E402
+from pose_detector import PoseDetector  # noqa: E402
+
+
+def measure(name, function, inputs, repeat=1, warmup=5, **extra):
+    """
+    Time a function over every input.
+
+    Args:
+        name: Result name
+        function: Called once per input
+        inputs: Sequence of inputs, replayed `repeat` times
+        repeat: Passes over the inputs
+        warmup: Calls made before timing starts
+        **extra: Additional fields for the result
+
+    Returns:
+        dict: Latency percentiles and throughput
+    """
+    for item in inputs[:warmup]:
+        function(item)
+
+    samples = []
+    cpu_began = time.process_time()
+    wall_began = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            began = time.perf_counter()
+            function(item)
+            samples.append(time.perf_counter() - began)
+    wall = time.perf_counter() - wall_began
+    cpu = time.process_time() - cpu_began
+
+    samples = np.array(samples) * 1e6
+    result = {
+        'name': name,
+        'frames': len(samples),
+        'p50_us': round(float(np.percentile(samples, 50)), 2),
+        'p99_us': round(float(np.percentile(samples, 99)), 2),
+        'mean_us': round(float(samples.mean()), 2),
+        'fps': round(len(samples) / wall, 1) if wall else None,
+        'fps_per_core': round(len(samples) / cpu, 1) if cpu else None,
+    }
+    result.update(extra)
+    print(f"{name:<36} p50 {result['p50_us']:>10.1f} us  p99 {result['p99_us']:>10.1f} us  "
+          f"{result['fps_per_core'] or 0:>10.1f} fps/core")
+    return result
+
+
+def bench_decode(frames, max_input_size):
+    results = []
+    for size, jpegs in frames.items():
+        payloads = ['data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii') for data in jpegs]
+        # Same steps as app.decode_image
+        results.append(measure(
+            f'decode_image/{size}',
+            lambda text: decode_frame(base64.b64decode(text.split(',')[1]), max_input_size),
+            payloads, repeat=5
+        ))
+    return results
+
+
+def bench_pose(frames, max_input_size, model_complexity):
+    results = []
+    for size, jpegs in frames.items():
+        images = [decode_frame(data, max_input_size) for data in jpegs]
+        detector = PoseDetector(max_input_size=max_input_size, model_complexity=model_complexity)
+        hits = []
+        result = measure(
+            f'pose_detect/{size}',
+            lambda image: hits.append(detector.detect(image) is not None),
+            images, repeat=2
+        )
+        result['detection_rate'] = round(sum(hits) / len(hits), 3)
+        results.append(result)
+        detector.pose.close()
+    return results
+
+
+def bench_landmarks(sequences):
+    frames = [LandmarkFrame(landmarks) for sequence in sequences.values() for landmarks in sequence]
+    points = [
+        tuple(frame.get_landmark(name) for name in ('LEFT_SHOULDER', 'LEFT_ELBOW', 'LEFT_WRIST'))
+        for frame in frames
+    ]
+    points = [triplet for triplet in points if None not in triplet]
+    return [
+        measure('get_landmark', lambda frame: frame.get_landmark('LEFT_ELBOW'), frames),
+        measure('calculate_angle', lambda triplet: calculate_angle(*triplet), points),
+    ]
+
+
+def bench_detectors(sequences):
+    results = []
+    for exercise_type, sequence in sequences.items():
+        detector = get_detector(exercise_type)
+        frames = [LandmarkFrame(landmarks) for landmarks in sequence]
+        result = measure(f'detector/{exercise_type}', detector.detect, frames, warmup=0)
+        # Sanity check that the sequence still exercises the state machine
+        result['reps'] = detector.count
+        results.append(result)
+    return results
+
+
+def bench_output(frames, sequences, max_input_size):
+    results = []
+    size, jpegs = next(iter(frames.items()))
+    image = decode_frame(jpegs[0], max_input_size)
+    landmarks = next(iter(sequences.values()))[:len(jpegs)]
+    annotated = render_overlay(image.copy(), landmarks[0])
+
+    results.append(measure(
+        f'annotate/{size}', lambda points: render_overlay(image.copy(), points), landmarks
+    ))
+    results.append(measure(
+        f'annotate_scaled/{size}', lambda points: render_overlay(image, points, 0.5), landmarks
+    ))
+    for quality in (80, 60):
+        results.append(measure(
+            f'encode_jpeg/{size}/q{quality}', lambda _: encode_jpeg(annotated, quality), landmarks
+        ))
+    results.append(measure('encode_landmarks', encode_landmarks, landmarks))
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare p50 latencies against a baseline run.
+
+    Returns:
+        list: (name, baseline p50, current p50) of results slower than
+            the baseline by more than the tolerance
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before and result['p50_us'] > before['p50_us'] * (1 + tolerance):
+            regressions.append((result['name'], before['p50_us'], result['p50_us']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the cv-service hot path')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results.json'),
+                        help='Where to write the JSON results')
+    parser.add_argument('--baseline', help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed p50 slowdown against the baseline (0.15 = 15%%)')
+    parser.add_argument('--input-size', type=int, default=int(os.environ.get('POSE_INPUT_SIZE', 640)),
+                        help='Pose input size, as POSE_INPUT_SIZE')
+    parser.add_argument('--model-complexity', type=int, default=1, help='MediaPipe model (0 = lite, 1 = full)')
+    parser.add_argument('--skip-pose', action='store_true', help='Skip the MediaPipe benchmark')
+    args = parser.parse_args()
+
+    # One thread per stage keeps the per-core numbers comparable between hosts
+    cv2.setNumThreads(1)
+    frames, sequences = load_corpus()
+
+    results = bench_decode(frames, args.input_size)
+    if not args.skip_pose:
+        results += bench_pose(frames, args.input_size, args.model_complexity)
+    results += bench_landmarks(sequences)
+    results += bench_detectors(sequences)
+    results += bench_output(frames, sequences, args.input_size)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'input_size': args.input_size,
+            'model_complexity': args.model_complexity,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f'REGRESSION {name}: p50 {before:.1f} us -> {after:.1f} us')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,19 +14,80 @@ os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"  # Suppress TensorFlow messages
 # Suppress Flask-Limiter in-memory storage warning (acceptable for dev)
 warnings.filterwarnings("ignore", message="Using the in-memory storage")
 
+from boot_timing import BootTimer
+
+# Startup is timed stage by stage from here; the breakdown is logged when
+# the service is ready and returned by /ready
+boot_timer = BootTimer()
+
+# The heavy imports, timed one by one (the service modules below use them)
+import numpy  # noqa: E402,F401
+boot_timer.mark('import_numpy')
+import cv2  # noqa: E402,F401
+boot_timer.mark('import_cv2')
+import mediapipe  # noqa: E402,F401
+boot_timer.mark('import_mediapipe')
+
 import base64
-import cv2
-import numpy as np
+import json
+import logging
+import math
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_sock import Sock, ConnectionClosed
+boot_timer.mark('import_flask')
 
-from pose_detector import PoseDetector
-from exercise_detectors import get_detector, SUPPORTED_EXERCISES
+from cost_limiter import CostLimiter, create_bucket_store
+from detector_pool import PoseDetectorPool
+from frame_decode import decode_frame
+from frame_output import encode_jpeg, encode_landmarks, parse_output_options, render_overlay
+from frame_stream import LatestFrameSlot
+from inference_workers import InferenceWorkerPool
+from joint_angles import LandmarkSequence
+from landmark_frame import LandmarkFrame, parse_landmarks
+from landmark_recorder import LandmarkRecorder
+from metrics import (
+    ACTIVE_SESSIONS, DETECTION_MISSES, FRAMES, NULL_TIMER, REPS, StageTimer, render_metrics
+)
+from motion_gate import MotionGate
+from quality_controller import QualityController
+from rep_counter import DEFAULT_FRAME_INTERVAL
+from service_logging import FrameLogSampler, configure_logging
+from session_store import SessionSweeper, create_store
+from video_analysis import analyze_video
+from video_jobs import create_job_store
+from exercise_detectors import SUPPORTED_EXERCISES, exercise_details
+boot_timer.mark('import_service')
+
+# Logs are written by a background thread, as JSON lines unless
+# LOG_FORMAT=text. Per-frame debug lines are logged for one in every
+# LOG_FRAME_SAMPLE frames of each session (0 = none), and for every frame
+# of sessions put in debug mode through /api/sessions/debug.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_FRAME_SAMPLE = int(os.environ.get('LOG_FRAME_SAMPLE', 100))
+configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
+
+# Number of reverse proxies in front of the app (0 = clients connect
+# directly). When set, the client address is taken from that many
+# X-Forwarded-For hops, and an X-User-Id header, which the proxy must set
+# after authenticating and strip from clients, keys the cost limit.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
 
 # Rate limiting
 limiter = Limiter(
@@ -35,34 +96,484 @@ limiter = Limiter(
     default_limits=["20000 per day", "5000 per hour"]
 )
 
-# Initialize pose detector
-pose_detector = PoseDetector()
+# Pool of pose detector graphs, one per concurrently inferring session.
+# Requests beyond the pool size wait for a graph to be checked back in.
+POSE_POOL_SIZE = int(os.environ.get('POSE_POOL_SIZE', 4))
+POSE_POOL_TIMEOUT = float(os.environ.get('POSE_POOL_TIMEOUT', 30))
 
-# Store exercise detectors per session (in production, use Redis or similar)
-exercise_detectors = {}
+# Frames are downscaled so their longest side is at most POSE_INPUT_SIZE
+# (0 = off) and, while a person is tracked, cropped to a box around them
+# padded by POSE_ROI_PADDING of its size
+POSE_DETECTOR_OPTIONS = {
+    'max_input_size': int(os.environ.get('POSE_INPUT_SIZE', 640)),
+    'roi_padding': float(os.environ.get('POSE_ROI_PADDING', 0.25)),
+    'use_roi': os.environ.get('POSE_ROI', 'true').lower() == 'true'
+}
 
+# With INFERENCE_WORKERS > 0, inference moves to that many worker processes
+# (each with POSE_POOL_SIZE graphs) and this process only decodes and counts.
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
 
-def decode_image(base64_string):
-    """Decode base64 string to OpenCV image."""
+# When the pose graphs are built and warmed up: 'import' (while this
+# module loads), 'background' (on a thread once it has loaded) or
+# 'deferred' (when start_worker() is called, as gunicorn.conf.py does in
+# each worker after forking from a preloaded master). Until they are
+# warm, /ready answers 503 and frame requests wait up to POSE_POOL_TIMEOUT.
+INFERENCE_INIT = os.environ.get('INFERENCE_INIT', 'import').lower()
+pose_pool = None
+inference_ready = threading.Event()
+
+
+def _release_pose_graph(session_id):
+    """Unpin a session from its pose graph, once there are graphs."""
+    if pose_pool is not None:
+        pose_pool.release(session_id)
+
+
+# Threads for decoding batched frames (cv2.imdecode releases the GIL)
+DECODE_THREADS = int(os.environ.get('DECODE_THREADS', 4))
+MAX_BATCH_FRAMES = int(os.environ.get('MAX_BATCH_FRAMES', 30))
+decode_executor = ThreadPoolExecutor(max_workers=DECODE_THREADS, thread_name_prefix='decode')
+
+# Offline video analysis jobs run one at a time per gunicorn worker, each
+# on its own process pool. Job status is kept in VIDEO_JOB_STORE (default
+# SESSION_STORE), so with sqlite a poll can land on any worker. Uploads
+# over MAX_VIDEO_BYTES are refused with 413; it also caps every other
+# request body.
+VIDEO_WORKERS = int(os.environ.get('VIDEO_WORKERS', 2))
+MAX_VIDEO_JOBS = 100
+MAX_VIDEO_BYTES = int(os.environ.get('MAX_VIDEO_BYTES', 200 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_VIDEO_BYTES
+video_jobs = create_job_store()
+video_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='video')
+
+# Exercise detector state per session. SESSION_STORE=sqlite shares it
+# between gunicorn workers on one host (see session_store.py).
+session_store = create_store()
+
+# Sessions without frames for SESSION_IDLE_TTL seconds, and the least
+# recently seen ones beyond MAX_SESSIONS, are dropped by a background sweep
+SESSION_IDLE_TTL = float(os.environ.get('SESSION_IDLE_TTL', 1800))
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 10000))
+SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', 60))
+session_sweeper = SessionSweeper(
+    session_store,
+    idle_ttl=SESSION_IDLE_TTL,
+    max_sessions=MAX_SESSIONS,
+    interval=SESSION_SWEEP_INTERVAL
+)
+session_sweeper.on_evict(_release_pose_graph)
+
+frame_log_sampler = FrameLogSampler(every=LOG_FRAME_SAMPLE, max_sessions=MAX_SESSIONS)
+session_sweeper.on_evict(frame_log_sampler.release)
+
+# Frames whose bytes match the session's last processed frame, or whose
+# thumbnail differs from it by less than MOTION_THRESHOLD (mean absolute
+# difference, 0-255), reuse its result instead of running inference
+MOTION_GATE = os.environ.get('MOTION_GATE', 'true').lower() == 'true'
+MOTION_THRESHOLD = float(os.environ.get('MOTION_THRESHOLD', 2.0))
+MOTION_MAX_SKIPS = int(os.environ.get('MOTION_MAX_SKIPS', 30))
+motion_gate = None
+if MOTION_GATE:
+    motion_gate = MotionGate(
+        threshold=MOTION_THRESHOLD,
+        max_consecutive_skips=MOTION_MAX_SKIPS,
+        max_sessions=MAX_SESSIONS
+    )
+    session_sweeper.on_evict(motion_gate.release)
+
+# Sessions whose inference latency (or the process's) runs over
+# LATENCY_BUDGET_MS step down to cheaper quality tiers until it recovers
+QUALITY_CONTROL = os.environ.get('QUALITY_CONTROL', 'true').lower() == 'true'
+LATENCY_BUDGET_MS = float(os.environ.get('LATENCY_BUDGET_MS', 200))
+quality_controller = None
+if QUALITY_CONTROL:
+    quality_controller = QualityController(budget_ms=LATENCY_BUDGET_MS, max_sessions=MAX_SESSIONS)
+    session_sweeper.on_evict(quality_controller.release)
+
+# With LANDMARK_RECORDING=true every frame a detector sees is appended,
+# quantized, with its timestamp and count to a per-session recording in
+# RECORDING_DIR, so workouts can be re-scored when thresholds change.
+# Frames are written by a background thread, RECORDING_BLOCK_FRAMES at a
+# time or after RECORDING_FLUSH_INTERVAL seconds.
+LANDMARK_RECORDING = os.environ.get('LANDMARK_RECORDING', 'false').lower() == 'true'
+landmark_recorder = None
+if LANDMARK_RECORDING:
+    landmark_recorder = LandmarkRecorder(
+        os.environ.get('RECORDING_DIR', '/tmp/fitform_recordings'),
+        block_frames=int(os.environ.get('RECORDING_BLOCK_FRAMES', 256)),
+        flush_interval=float(os.environ.get('RECORDING_FLUSH_INTERVAL', 5.0))
+    )
+    session_sweeper.on_evict(landmark_recorder.release)
+
+session_sweeper.start()
+
+# Frame endpoints are also limited per client by the work they cause:
+# each client address (or X-User-Id, with TRUSTED_PROXIES) earns
+# COST_LIMIT_RATE units per second up to COST_LIMIT_BURST, charged in
+# milliseconds of decode/inference/encode work or in frames
+# (COST_LIMIT_UNIT). Buckets are shared by all workers on the host when
+# the store is sqlite (COST_LIMIT_STORE, defaulting to SESSION_STORE).
+COST_LIMIT = os.environ.get('COST_LIMIT', 'true').lower() == 'true'
+COST_LIMIT_UNIT = os.environ.get('COST_LIMIT_UNIT', 'ms').lower()
+_DEFAULT_COST_LIMITS = {'ms': (600.0, 20000.0), 'frames': (15.0, 300.0)}
+cost_limiter = None
+if COST_LIMIT:
+    default_rate, default_burst = _DEFAULT_COST_LIMITS.get(COST_LIMIT_UNIT, (0.0, 0.0))
+    cost_limiter = CostLimiter(
+        create_bucket_store(),
+        rate=float(os.environ.get('COST_LIMIT_RATE', default_rate)),
+        burst=float(os.environ.get('COST_LIMIT_BURST', default_burst)),
+        unit=COST_LIMIT_UNIT
+    )
+
+
+# Content types accepted as a raw (non-JSON) frame upload on /api/detect
+BINARY_FRAME_TYPES = ('image/jpeg', 'image/webp', 'image/png', 'multipart/form-data')
+
+
+def decode_base64(base64_string):
+    """Decode a base64 string or data URL to bytes, or None if it is invalid."""
     try:
         # Remove data URL prefix if present
         if ',' in base64_string:
             base64_string = base64_string.split(',')[1]
-            
-        # Decode base64
-        img_bytes = base64.b64decode(base64_string)
-        img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-        image = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        return image
+        return base64.b64decode(base64_string)
     except Exception as e:
-        print(f"Error decoding image: {e}")
+        logger.warning('Error decoding image: %s', e)
+        return None
+
+
+def decode_image(base64_string):
+    """Decode base64 string to OpenCV image."""
+    img_bytes = decode_base64(base64_string)
+    if img_bytes is None:
+        return None
+    return decode_image_bytes(img_bytes)
+
+
+def decode_image_bytes(img_bytes):
+    """
+    Decode encoded image bytes (JPEG/WebP/PNG) to OpenCV image.
+
+    JPEGs larger than the pose input size are decoded at reduced scale;
+    landmarks are normalized, so only the annotated preview gets smaller.
+    """
+    return decode_frame(img_bytes, POSE_DETECTOR_OPTIONS['max_input_size'])
+
+
+def _read_binary_frame():
+    """Read the encoded frame from a raw image body or a multipart upload."""
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        return upload.read() if upload else None
+    # Read straight from the stream; skip caching a second copy on the request
+    return request.get_data(cache=False)
+
+
+def _binary_frame_options():
+    """
+    Collect detect options for a binary upload.
+
+    Options come from the query string, multipart form fields, or
+    X-Exercise-Type / X-Session-Id / X-Output-Mode / X-Jpeg-Quality /
+    X-Jpeg-Scale / X-Return-Image headers, in that order.
+    """
+    def _option(name, header):
+        return request.args.get(name) or request.form.get(name) or request.headers.get(header)
+
+    return {
+        'exercise_type': _option('exercise_type', 'X-Exercise-Type'),
+        'session_id': _option('session_id', 'X-Session-Id'),
+        'output_mode': _option('output_mode', 'X-Output-Mode'),
+        'jpeg_quality': _option('jpeg_quality', 'X-Jpeg-Quality'),
+        'jpeg_scale': _option('jpeg_scale', 'X-Jpeg-Scale'),
+        'return_image': _option('return_image', 'X-Return-Image'),
+        'timestamp': _option('timestamp', 'X-Timestamp')
+    }
+
+
+def _cost_key():
+    """
+    Key of the token bucket a frame request is charged to.
+
+    Session ids and unproxied headers are chosen by the client, so only
+    the user a trusted proxy authenticated or the client address counts.
+    """
+    if TRUSTED_PROXIES:
+        user_id = request.headers.get('X-User-Id')
+        if user_id:
+            return f'user:{user_id}'
+    return f'addr:{get_remote_address()}'
+
+
+def _rate_limited(key):
+    """
+    Check a client's cost bucket before doing any work for it.
+
+    Returns:
+        float: 0 if the request may proceed, else seconds to wait
+    """
+    if cost_limiter is None:
+        return 0.0
+    retry_after = cost_limiter.check(key)
+    if retry_after:
+        FRAMES.labels('rate_limited').inc()
+    return retry_after
+
+
+def _rate_limited_response(retry_after):
+    response = jsonify({'error': 'Rate limit exceeded', 'retry_after': round(retry_after, 3)})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
+
+def _charge(key, timer, frames):
+    """Charge a finished request's work (timed stages, not waiting) or frames."""
+    if cost_limiter is None:
+        return
+    if cost_limiter.unit == 'frames':
+        cost = frames
+    else:
+        cost = sum(seconds for stage, seconds in timer.seconds.items() if stage != 'pool_wait') * 1000
+    cost_limiter.charge(key, cost)
+
+
+def _timestamp_seconds(value):
+    """
+    Convert a client frame timestamp (milliseconds since the epoch) to seconds.
+
+    Raises:
+        ValueError: If the value is not a number
+    """
+    if value is None or value == '':
         return None
+    try:
+        return float(value) / 1000
+    except (TypeError, ValueError):
+        raise ValueError('timestamp must be a number of milliseconds')
+
+
+def _frame_times(timestamps, count):
+    """
+    Fill in frame times (seconds) for frames sent without a timestamp.
+
+    Live frames are stamped with the time they are processed; frames of
+    a batch without timestamps are assumed DEFAULT_FRAME_INTERVAL apart,
+    ending now.
+    """
+    now = time.time()
+    timestamps = timestamps or [None] * count
+    return [
+        now - (count - 1 - i) * DEFAULT_FRAME_INTERVAL if timestamp is None else timestamp
+        for i, timestamp in enumerate(timestamps)
+    ]
+
+
+def update_detector(detector, pose_view, session_id, timestamp=None):
+    """
+    Advance an exercise detector with one frame of landmarks.
+
+    Args:
+        detector: ExerciseDetector for the session
+        pose_view: PoseDetector or LandmarkFrame holding the frame's landmarks
+        session_id: Session identifier, used for sampled frame logs
+        timestamp: Frame time in seconds
+
+    Returns:
+        dict: Detector state including landmarks_detected
+    """
+    landmarks_detected = pose_view.landmarks_detected()
+
+    # Detect exercise if landmarks found
+    if landmarks_detected:
+        state = detector.detect(pose_view, timestamp)
+    else:
+        state = detector.get_state()
+        state['form_feedback'] = ['No person detected. Please step into frame.']
+
+    state['landmarks_detected'] = landmarks_detected
+    if landmark_recorder is not None:
+        landmark_recorder.record(
+            session_id, detector.exercise_type, timestamp, pose_view.landmarks,
+            state['count'], detector.counter.zone
+        )
+    if logger.isEnabledFor(logging.INFO) and frame_log_sampler.should_log(session_id):
+        logger.info('frame', extra={
+            'session_id': session_id,
+            'exercise_type': detector.exercise_type,
+            'count': state['count'],
+            'stage': state['stage'],
+            'landmarks_detected': landmarks_detected,
+            **{key: value for key, value in state.items() if key.endswith('_angle')}
+        })
+    return state
+
+
+def process_frame(image, session_id, exercise_type, output=None, payload=None, timer=None,
+                  timestamp=None):
+    """
+    Run pose detection and rep counting on one decoded frame.
+
+    Args:
+        image: BGR image (numpy array)
+        session_id: Session identifier
+        exercise_type: One of SUPPORTED_EXERCISES
+        output: Output options from parse_output_options (default: none)
+        payload: Encoded frame the image was decoded from (for the motion gate)
+        timer: StageTimer collecting the request's stage timings
+        timestamp: Capture time in seconds (default: now)
+
+    Returns:
+        dict: Detector state for the response
+
+    Raises:
+        TimeoutError: If the pose graphs did not warm up or the session's graph
+            could not be checked out in time
+    """
+    payloads = None if payload is None else [payload]
+    return process_frames([image], session_id, exercise_type, output, payloads, timer, [timestamp])[0]
+
+
+def process_frames(images, session_id, exercise_type, output=None, payloads=None, timer=None,
+                   timestamps=None):
+    """
+    Run pose detection and rep counting on a session's frames, in order.
+
+    The session's pose graph is checked out once for the whole sequence;
+    the detector state is read, updated and written back once per frame.
+    Frames that failed to decode (None) leave the detector untouched.
+    Frames the motion gate finds unchanged reuse the previous landmarks
+    and state without running inference. The quality controller picks
+    the session's model, input size and annotation for the whole call.
+
+    Args:
+        images: List of BGR images (numpy arrays or None)
+        session_id: Session identifier
+        exercise_type: One of SUPPORTED_EXERCISES
+        output: Output options from parse_output_options (default: none).
+            In jpeg mode only the last frame is annotated; in landmarks
+            mode every frame carries its landmarks.
+        payloads: Encoded frames the images were decoded from, if available
+        timer: StageTimer collecting the request's stage timings
+        timestamps: Capture times in seconds, if known (see _frame_times)
+
+    Returns:
+        list: One detector state per frame
+
+    Raises:
+        TimeoutError: If the pose graphs did not warm up or the session's graph
+            could not be checked out in time
+    """
+    mode = output['mode'] if output else 'none'
+    timer = timer or NULL_TIMER
+    timestamps = _frame_times(timestamps, len(images))
+    states = []
+
+    tier = quality_controller.tier(session_id) if quality_controller is not None else None
+    if tier is not None and not tier['annotate'] and mode == 'jpeg':
+        # Clients can still draw the skeleton themselves
+        mode = 'landmarks'
+
+    # Check out the pose graph pinned to this session; time spent waiting
+    # for it (or for the graphs to warm up at boot) counts towards the
+    # first frame's latency
+    began = time.perf_counter()
+    if not inference_ready.wait(POSE_POOL_TIMEOUT):
+        raise TimeoutError("Pose graphs are still warming up")
+    pose_detector = pose_pool.checkout(session_id, timeout=POSE_POOL_TIMEOUT)
+    waited_ms = (time.perf_counter() - began) * 1000
+    timer.add('pool_wait', waited_ms / 1000)
+    try:
+        if tier is not None:
+            pose_detector.configure(model_complexity=tier['model_complexity'],
+                                    max_input_size=tier['input_size'])
+        for i, image in enumerate(images):
+            if image is None:
+                with session_store.checkout(session_id, exercise_type) as detector:
+                    state = detector.get_state()
+                state['error'] = 'Invalid image data'
+                states.append(state)
+                FRAMES.labels('invalid').inc()
+                continue
+
+            reason = None
+            if motion_gate is not None:
+                payload = payloads[i] if payloads else None
+                reason, landmarks, state, digest, thumbnail = motion_gate.check(
+                    session_id, exercise_type, image, payload
+                )
+
+            if reason is not None:
+                # Unchanged frame: keep the previous result, but take the
+                # count and stage from the store in case they were reset
+                detector = session_store.get(session_id, exercise_type)
+                if detector is not None:
+                    state.update(
+                        count=detector.count,
+                        stage=detector.stage,
+                        calories_burned=detector.get_calories()
+                    )
+                FRAMES.labels('skipped').inc()
+            else:
+                # Detect pose
+                began = time.perf_counter()
+                landmarks = pose_detector.detect(image)
+                timer.add_all(pose_detector.stage_seconds)
+                if quality_controller is not None:
+                    latency_ms = (time.perf_counter() - began) * 1000 + waited_ms
+                    quality_controller.observe(session_id, latency_ms)
+                    waited_ms = 0.0
+                with timer.stage('detector'):
+                    with session_store.checkout(session_id, exercise_type) as detector:
+                        count_before = detector.count
+                        state = update_detector(
+                            detector, LandmarkFrame(landmarks), session_id, timestamps[i]
+                        )
+
+                FRAMES.labels('processed').inc()
+                if landmarks is None:
+                    DETECTION_MISSES.inc()
+                if state['count'] > count_before:
+                    REPS.labels(exercise_type).inc(state['count'] - count_before)
+                if motion_gate is not None:
+                    motion_gate.record(session_id, exercise_type, digest, thumbnail, landmarks, state)
+
+            if tier is not None:
+                state['quality'] = {
+                    'tier': tier['name'],
+                    'level': tier['level'],
+                    'recommended_fps': tier['recommended_fps']
+                }
+            if motion_gate is not None:
+                state['motion_gate'] = {
+                    'skipped': reason is not None,
+                    'reason': reason,
+                    'skip_ratio': motion_gate.skip_ratio(session_id)
+                }
+
+            if mode == 'landmarks':
+                with timer.stage('encode'):
+                    state['landmarks'] = encode_landmarks(landmarks)
+            elif mode == 'jpeg' and i == len(images) - 1:
+                # The decoded frame belongs to this request and inference is
+                # done with it, so the overlay is drawn on it in place
+                with timer.stage('annotate'):
+                    annotated = render_overlay(image, landmarks, output['scale'])
+                with timer.stage('encode'):
+                    annotated = encode_jpeg(annotated, output['quality'])
+                if annotated:
+                    state['annotated_image'] = annotated
+            states.append(state)
+    finally:
+        pose_pool.checkin(session_id)
+
+    return states
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint."""
+    """Liveness check: the process is up. See /ready for inference."""
     return jsonify({
         'status': 'healthy',
         'service': 'cv-service',
@@ -70,28 +581,35 @@ def health_check():
     })
 
 
+@app.route('/ready', methods=['GET'])
+@limiter.exempt
+def readiness_check():
+    """
+    Readiness probe: 200 once the pose graphs are built and warmed up.
+
+    /health only says the process is up; route traffic on this one.
+    Both answers carry the startup timing breakdown so far.
+    """
+    if not inference_ready.is_set():
+        return jsonify({'status': 'warming_up', 'boot': boot_timer.report()}), 503
+    return jsonify({'status': 'ready', 'boot': boot_timer.report()})
+
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Prometheus metrics: detect stage histograms, frame, miss and rep counters."""
+    ACTIVE_SESSIONS.set(session_store.session_count())
+    body, content_type = render_metrics()
+    return app.response_class(body, content_type=content_type)
+
+
 @app.route('/api/exercises', methods=['GET'])
 def get_exercises():
     """Get list of supported exercises."""
     return jsonify({
         'exercises': SUPPORTED_EXERCISES,
-        'details': {
-            'pushup': {
-                'name': 'Push-up',
-                'calories_per_rep': 0.35,
-                'description': 'Upper body exercise targeting chest, shoulders, and triceps'
-            },
-            'squat': {
-                'name': 'Squat',
-                'calories_per_rep': 0.32,
-                'description': 'Lower body exercise targeting quadriceps, hamstrings, and glutes'
-            },
-            'situp': {
-                'name': 'Sit-up',
-                'calories_per_rep': 0.25,
-                'description': 'Core exercise targeting abdominal muscles'
-            }
-        }
+        'details': exercise_details()
     })
 
 
@@ -104,9 +622,25 @@ def detect_exercise():
     Request body:
     {
         "image": "base64_encoded_image",
-        "exercise_type": "pushup|squat|situp",
-        "session_id": "optional_session_identifier"
+        "exercise_type": "pushup|squat|situp|lunge",
+        "session_id": "optional_session_identifier",
+        "output_mode": "none|landmarks|jpeg",
+        "jpeg_quality": 80,
+        "jpeg_scale": 1.0,
+        "timestamp": 1700000000000
     }
+
+    timestamp is the capture time in milliseconds; without it the frame
+    is stamped on arrival, which is less exact for counting.
+
+    output_mode "landmarks" adds {"points": [[x, y, visibility], ...],
+    "connections": [[a, b], ...]} as "landmarks" for client-side drawing;
+    "jpeg" adds a server-rendered "annotated_image" data URL. The legacy
+    "return_image": true still means jpeg.
+    
+    Alternatively the frame can be sent as a raw image/jpeg, image/webp or
+    image/png body (or a multipart "image" file) with the options in the
+    query string or X-* headers. This skips base64 and JSON parsing entirely.
     
     Response:
     {
@@ -117,62 +651,426 @@ def detect_exercise():
         "landmarks_detected": true
     }
     """
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'No JSON data provided'}), 400
-        
-    # Validate image
-    image_data = data.get('image')
-    if not image_data:
-        return jsonify({'error': 'No image provided'}), 400
-        
+    timer = StageTimer()
+    binary = request.mimetype in BINARY_FRAME_TYPES
+    with timer.stage('parse'):
+        if binary:
+            data = _binary_frame_options()
+            image_bytes = _read_binary_frame()
+        else:
+            data = request.get_json(silent=True)
+            image_bytes = None
+
+    if binary:
+        if not image_bytes:
+            return jsonify({'error': 'No image provided'}), 400
+    else:
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+
+        # Validate image
+        image_data = data.get('image')
+        if not image_data:
+            return jsonify({'error': 'No image provided'}), 400
+
     # Validate exercise type
-    exercise_type = data.get('exercise_type', 'pushup').lower()
+    exercise_type = (data.get('exercise_type') or 'pushup').lower()
     if exercise_type not in SUPPORTED_EXERCISES:
         return jsonify({
             'error': f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}'
         }), 400
         
     # Session ID for tracking state
-    session_id = data.get('session_id', 'default')
-    detector_key = f"{session_id}_{exercise_type}"
-    
-    # Get or create detector
-    if detector_key not in exercise_detectors:
-        exercise_detectors[detector_key] = get_detector(exercise_type)
-        
-    detector = exercise_detectors[detector_key]
+    session_id = data.get('session_id') or 'default'
+
+    try:
+        output = parse_output_options(data)
+        timestamp = _timestamp_seconds(data.get('timestamp'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    cost_key = _cost_key()
+    retry_after = _rate_limited(cost_key)
+    if retry_after:
+        return _rate_limited_response(retry_after)
     
     # Decode image
-    image = decode_image(image_data)
+    if image_bytes is None:
+        with timer.stage('base64'):
+            image_bytes = decode_base64(image_data)
+    image = None
+    if image_bytes is not None:
+        with timer.stage('imdecode'):
+            image = decode_image_bytes(image_bytes)
     if image is None:
         return jsonify({'error': 'Invalid image data'}), 400
-        
-    # Detect pose
-    results = pose_detector.detect(image)
-    landmarks_detected = pose_detector.landmarks_detected()
-    
-    # Detect exercise if landmarks found
-    if landmarks_detected:
-        state = detector.detect(pose_detector)
-        print(f"[DEBUG] key={detector_key}, count={state.get('count')}, stage={state.get('stage')}, elbow={state.get('elbow_angle')}")
+
+    try:
+        state = process_frame(image, session_id, exercise_type, output, image_bytes, timer, timestamp)
+    except TimeoutError:
+        return jsonify({'error': 'Server busy, please retry'}), 503
+
+    with timer.stage('serialize'):
+        response = jsonify(state)
+    _charge(cost_key, timer, 1)
+    timer.observe()
+    response.headers['Server-Timing'] = timer.server_timing()
+    # Let the cross-origin web app read the timings via the Resource Timing API
+    response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+
+@sock.route('/api/stream')
+def stream_session(ws):
+    """
+    Stream frames for one workout session over a WebSocket.
+
+    The first message must be a JSON text message:
+    {
+        "exercise_type": "pushup|squat|situp|lunge",
+        "session_id": "optional_session_identifier",
+        "output_mode": "none|landmarks|jpeg"
+    }
+
+    jpeg_quality, jpeg_scale and the legacy return_image are accepted as
+    on /api/detect. After that every binary message is an encoded frame (JPEG/WebP/PNG)
+    and the server answers each processed frame with the same JSON state
+    as /api/detect plus "dropped_frames". If frames arrive faster than
+    they can be processed only the newest pending frame is kept. A text
+    message {"action": "reset"} resets the rep counter.
+    """
+    try:
+        config = json.loads(ws.receive())
+    except (TypeError, ValueError):
+        ws.close(message='First message must be JSON config')
+        return
+
+    exercise_type = (config.get('exercise_type') or 'pushup').lower()
+    if exercise_type not in SUPPORTED_EXERCISES:
+        ws.close(message=f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}')
+        return
+    session_id = config.get('session_id') or 'default'
+    try:
+        output = parse_output_options(config)
+    except ValueError as e:
+        ws.close(message=str(e))
+        return
+
+    cost_key = _cost_key()
+    slot = LatestFrameSlot()
+
+    def _receive_frames():
+        try:
+            while True:
+                message = ws.receive()
+                if isinstance(message, (bytes, bytearray)):
+                    slot.put(message)
+                elif message:
+                    try:
+                        control = json.loads(message)
+                    except ValueError:
+                        continue
+                    if isinstance(control, dict) and control.get('action') == 'reset':
+                        session_store.reset(session_id, exercise_type)
+                        if motion_gate is not None:
+                            motion_gate.forget(session_id)
+        except ConnectionClosed:
+            pass
+        finally:
+            slot.close()
+
+    threading.Thread(target=_receive_frames, daemon=True).start()
+
+    try:
+        while not slot.closed:
+            frame = slot.get()
+            if frame is None:
+                continue
+
+            retry_after = _rate_limited(cost_key)
+            if retry_after:
+                ws.send(json.dumps({'error': 'Rate limit exceeded', 'retry_after': round(retry_after, 3)}))
+                continue
+
+            timer = StageTimer()
+            with timer.stage('imdecode'):
+                image = decode_image_bytes(frame)
+            if image is None:
+                ws.send(json.dumps({'error': 'Invalid image data'}))
+                continue
+
+            try:
+                state = process_frame(image, session_id, exercise_type, output, frame, timer)
+            except TimeoutError:
+                ws.send(json.dumps({'error': 'Server busy, please retry'}))
+                continue
+            _charge(cost_key, timer, 1)
+
+            state['dropped_frames'] = slot.dropped
+            ws.send(json.dumps(state))
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+
+
+@app.route('/api/detect_batch', methods=['POST'])
+@limiter.limit("600 per minute")
+def detect_batch():
+    """
+    Detect exercise across several buffered frames of one session.
+
+    Frames are decoded in parallel, then run through the session's pose
+    graph and exercise detector in the order given.
+
+    Request body:
+    {
+        "frames": [
+            {"image": "base64_encoded_image", "timestamp": 1700000000000},
+            ...
+        ],
+        "exercise_type": "pushup|squat|situp|lunge",
+        "session_id": "optional_session_identifier",
+        "output_mode": "none|landmarks|jpeg"
+    }
+
+    Alternatively send multipart/form-data with repeated "image" files,
+    an optional comma-separated "timestamps" field and the other options
+    as form fields or query parameters.
+
+    Response:
+    {
+        "states": [{..., "timestamp": 1700000000000}, ...],
+        "count": 10,
+        "calories_burned": 3.5
+    }
+
+    In jpeg output mode only the last frame is annotated.
+    """
+    if request.mimetype == 'multipart/form-data':
+        data = _binary_frame_options()
+        encoded = [upload.read() for upload in request.files.getlist('image')]
+        try:
+            timestamps = [float(t) for t in request.form.get('timestamps', '').split(',') if t.strip()]
+        except ValueError:
+            return jsonify({'error': 'timestamps must be comma-separated numbers'}), 400
+        decode = decode_image_bytes
     else:
-        state = detector.get_state()
-        state['form_feedback'] = ['No person detected. Please step into frame.']
-        print(f"[DEBUG] key={detector_key}, NO LANDMARKS, count={state.get('count')}")
-        
-    state['landmarks_detected'] = landmarks_detected
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        frames = data.get('frames')
+        if not isinstance(frames, list):
+            return jsonify({'error': 'frames must be a list'}), 400
+        try:
+            encoded = [frame['image'] for frame in frames]
+        except (TypeError, KeyError):
+            return jsonify({'error': 'Each frame needs an image'}), 400
+        timestamps = [frame.get('timestamp') for frame in frames]
+        decode = decode_image
 
-    # Optional annotated image return (draw landmarks like MediaPipe demo)
-    if data.get('return_image', False) and results is not None:
-        annotated = pose_detector.draw_landmarks(image.copy(), results)
-        success, buffer = cv2.imencode('.jpg', annotated)
-        if success:
-            encoded = base64.b64encode(buffer).decode('utf-8')
-            state['annotated_image'] = f"data:image/jpeg;base64,{encoded}"
-    
-    return jsonify(state)
+    if not encoded:
+        return jsonify({'error': 'No frames provided'}), 400
+    if len(encoded) > MAX_BATCH_FRAMES:
+        return jsonify({'error': f'At most {MAX_BATCH_FRAMES} frames per batch'}), 400
+
+    exercise_type = (data.get('exercise_type') or 'pushup').lower()
+    if exercise_type not in SUPPORTED_EXERCISES:
+        return jsonify({
+            'error': f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}'
+        }), 400
+    session_id = data.get('session_id') or 'default'
+    try:
+        output = parse_output_options(data)
+        frame_times = [_timestamp_seconds(timestamp) for timestamp in timestamps]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    frame_times = (frame_times + [None] * len(encoded))[:len(encoded)]
+
+    cost_key = _cost_key()
+    retry_after = _rate_limited(cost_key)
+    if retry_after:
+        return _rate_limited_response(retry_after)
+
+    # Decode in parallel; map() keeps the original frame order
+    timer = StageTimer()
+    with timer.stage('imdecode'):
+        images = list(decode_executor.map(decode, encoded))
+
+    try:
+        states = process_frames(images, session_id, exercise_type, output, encoded, timer, frame_times)
+    except TimeoutError:
+        return jsonify({'error': 'Server busy, please retry'}), 503
+    _charge(cost_key, timer, len(encoded))
+
+    for state, timestamp in zip(states, timestamps):
+        state['timestamp'] = timestamp
+
+    return jsonify({
+        'states': states,
+        'count': states[-1]['count'],
+        'calories_burned': states[-1]['calories_burned']
+    })
+
+
+@app.route('/api/landmarks', methods=['POST'])
+@limiter.limit("6000 per minute")
+def ingest_landmarks():
+    """
+    Count reps from pose landmarks computed on the client.
+
+    Skips server-side pose inference entirely; only the exercise state
+    machines run. Landmarks use MediaPipe's 33-point order and normalized
+    coordinates.
+
+    Request body (single frame):
+    {
+        "landmarks": [[x, y, visibility], ...33] or flat list of 99 numbers,
+        "exercise_type": "pushup|squat|situp|lunge",
+        "session_id": "optional_session_identifier",
+        "timestamp": 1700000000000
+    }
+
+    Or a batch, in capture order ("null" marks a frame with no person):
+    {
+        "frames": [[[x, y, visibility], ...], null, ...],
+        "timestamps": [1700000000000, 1700000000200, ...],
+        ...
+    }
+
+    Timestamps (milliseconds) are optional but make rep counting
+    exact at low or uneven frame rates.
+
+    Response: the /api/detect state for a single frame, or
+    {"states": [...], "count": 10, "calories_burned": 3.5} for a batch.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+
+    exercise_type = (data.get('exercise_type') or 'pushup').lower()
+    if exercise_type not in SUPPORTED_EXERCISES:
+        return jsonify({
+            'error': f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}'
+        }), 400
+
+    session_id = data.get('session_id') or 'default'
+
+    is_batch = 'frames' in data
+    if not is_batch and 'landmarks' not in data:
+        return jsonify({'error': 'No landmarks provided'}), 400
+    raw_frames = data['frames'] if is_batch else [data['landmarks']]
+    if not isinstance(raw_frames, list):
+        return jsonify({'error': 'frames must be a list'}), 400
+
+    try:
+        frames = [parse_landmarks(values) for values in raw_frames]
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid landmarks: {e}'}), 400
+
+    if not frames:
+        return jsonify({'error': 'No frames provided'}), 400
+
+    raw_timestamps = data.get('timestamps') if is_batch else [data.get('timestamp')]
+    if raw_timestamps is not None and (
+            not isinstance(raw_timestamps, list) or len(raw_timestamps) != len(frames)):
+        return jsonify({'error': 'timestamps must be a list with one entry per frame'}), 400
+    try:
+        timestamps = _frame_times(
+            raw_timestamps and [_timestamp_seconds(value) for value in raw_timestamps], len(frames)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Joint angles for the whole batch come from one vectorized pass
+    if is_batch:
+        sequence = LandmarkSequence(frames)
+        views = [sequence.frame(i) for i in range(len(sequence))]
+    else:
+        views = [LandmarkFrame(frames[0])]
+
+    # One read-modify-write of the session state for the whole batch
+    with session_store.checkout(session_id, exercise_type) as detector:
+        states = [
+            update_detector(detector, view, session_id, timestamp)
+            for view, timestamp in zip(views, timestamps)
+        ]
+
+    if not is_batch:
+        return jsonify(states[0])
+    return jsonify({
+        'states': states,
+        'count': states[-1]['count'],
+        'calories_burned': states[-1]['calories_burned']
+    })
+
+
+def _run_video_job(job_id, path, exercise_type, frame_step):
+    """Analyze an uploaded video in the background and store the result."""
+    video_jobs.update(job_id, status='running')
+    try:
+        result = analyze_video(path, exercise_type, workers=VIDEO_WORKERS, frame_step=frame_step)
+        video_jobs.update(job_id, status='done', result=result)
+    except Exception as e:
+        video_jobs.update(job_id, status='failed', error=str(e))
+    finally:
+        os.unlink(path)
+
+
+@app.route('/api/videos', methods=['POST'])
+@limiter.limit("10 per hour")
+def submit_video():
+    """
+    Queue a recorded workout video for offline rep counting.
+
+    Request: multipart/form-data with a "video" file, "exercise_type"
+    and optional "frame_step" (process every Nth frame). Bodies over
+    MAX_VIDEO_BYTES get 413.
+
+    Response (202):
+    {
+        "job_id": "...",
+        "status": "queued"
+    }
+    """
+    if request.content_length is not None and request.content_length > MAX_VIDEO_BYTES:
+        # Refuse before reading any of the body
+        return _too_large_response()
+    upload = request.files.get('video')
+    if not upload:
+        return jsonify({'error': 'No video provided'}), 400
+
+    exercise_type = (request.form.get('exercise_type') or 'pushup').lower()
+    if exercise_type not in SUPPORTED_EXERCISES:
+        return jsonify({
+            'error': f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}'
+        }), 400
+    try:
+        frame_step = max(1, int(request.form.get('frame_step', 1)))
+    except ValueError:
+        return jsonify({'error': 'frame_step must be an integer'}), 400
+
+    # Stream the upload to disk; VideoCapture reads it from there frame by frame
+    suffix = os.path.splitext(upload.filename or '')[1] or '.mp4'
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        upload.save(f)
+        path = f.name
+
+    # The oldest finished jobs are forgotten once the table is full
+    job_id = uuid.uuid4().hex
+    video_jobs.create(job_id, {'status': 'queued', 'exercise_type': exercise_type}, MAX_VIDEO_JOBS)
+    video_executor.submit(_run_video_job, job_id, path, exercise_type, frame_step)
+
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+@app.route('/api/videos/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Get the status, and once done the result, of a video analysis job."""
+    job = video_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(dict(job, job_id=job_id))
 
 
 @app.route('/api/reset', methods=['POST'])
@@ -183,22 +1081,23 @@ def reset_counter():
     
     Request body:
     {
-        "exercise_type": "pushup|squat|situp",
+        "exercise_type": "pushup|squat|situp|lunge",
         "session_id": "optional_session_identifier"
     }
     """
     data = request.get_json() or {}
     
     exercise_type = data.get('exercise_type', 'pushup').lower()
+    if exercise_type not in SUPPORTED_EXERCISES:
+        return jsonify({
+            'error': f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}'
+        }), 400
     session_id = data.get('session_id', 'default')
-    detector_key = f"{session_id}_{exercise_type}"
-    
-    # Delete old session and create fresh detector
-    if detector_key in exercise_detectors:
-        del exercise_detectors[detector_key]
     
-    # Create a fresh detector for this session
-    exercise_detectors[detector_key] = get_detector(exercise_type)
+    # Replace any existing detector with a fresh one
+    session_store.reset(session_id, exercise_type)
+    if motion_gate is not None:
+        motion_gate.forget(session_id)
         
     return jsonify({
         'message': 'Counter reset',
@@ -226,29 +1125,135 @@ def cleanup_sessions():
         return jsonify({'error': 'session_id required'}), 400
     
     # Remove all detectors for this session
-    keys_to_remove = [k for k in exercise_detectors.keys() if k.startswith(session_id)]
-    for key in keys_to_remove:
-        del exercise_detectors[key]
+    removed = session_store.delete_session(session_id)
+
+    # Free the session's pose graph for other users
+    _release_pose_graph(session_id)
+    if quality_controller is not None:
+        quality_controller.release(session_id)
+    if motion_gate is not None:
+        motion_gate.release(session_id)
+    if landmark_recorder is not None:
+        landmark_recorder.release(session_id)
+    frame_log_sampler.release(session_id)
     
     return jsonify({
         'message': 'Session cleaned up',
-        'removed': len(keys_to_remove)
+        'removed': removed
     })
 
 
 @app.route('/api/state', methods=['GET'])
 def get_state():
     """
-    Get current state of all detectors.
+    Get current state of the detectors, one page of sessions at a time.
     Useful for debugging.
+
+    Query parameters:
+        offset: Number of sessions to skip (default 0)
+        limit: Sessions per page (default 50, max 500)
     """
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', 50, type=int)), 500)
+
     states = {}
-    for key, detector in exercise_detectors.items():
-        states[key] = detector.get_state()
-    return jsonify(states)
+    for session_id, detectors in session_store.list_sessions(offset, limit):
+        for exercise_type, detector in detectors.items():
+            states[f"{session_id}_{exercise_type}"] = detector.get_state()
+    return jsonify({
+        'states': states,
+        'offset': offset,
+        'limit': limit,
+        'total_sessions': session_store.session_count()
+    })
+
+
+@app.route('/api/sessions/debug', methods=['POST'])
+@limiter.limit("10 per minute")
+def debug_session():
+    """
+    Log every frame of one session for a while, regardless of sampling.
+
+    Debug mode lives in the process that receives this request; with
+    several gunicorn workers, frames handled by the others stay sampled.
+
+    Request body:
+    {
+        "session_id": "session_to_debug",
+        "enabled": true,
+        "duration": 300
+    }
+    """
+    data = request.get_json() or {}
+    session_id = data.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'session_id required'}), 400
+    try:
+        duration = min(float(data.get('duration', 300)), 3600.0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'duration must be a number of seconds'}), 400
+
+    enabled = data.get('enabled', True) is not False
+    frame_log_sampler.set_debug(session_id, enabled, duration)
+    return jsonify({
+        'session_id': session_id,
+        'enabled': enabled,
+        'debug_sessions': frame_log_sampler.debug_sessions()
+    })
+
+
+def _process_rss_bytes():
+    """Current resident set size of this process, or None if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def get_session_stats():
+    """
+    Get session counts and memory accounting.
+
+    Response:
+    {
+        "store": {"sessions": 12, "detectors": 12, "approx_bytes": 4096},
+        "pose_pool": {...},
+        "evicted_total": 3,
+        "motion_gate": {"frames": 900, "skipped_duplicate": 12, "skipped_still": 200, ...},
+        "quality": {"budget_ms": 200, "process_latency_ms": 85.2, "sessions_per_tier": {...}},
+        "recording": {"frames_recorded": 5000, "frames_dropped": 0, "bytes_written": 420000, ...},
+        "rss_bytes": 512000000
+    }
+    """
+    return jsonify({
+        'store': session_store.memory_stats(),
+        'pose_pool': pose_pool.stats() if pose_pool is not None else None,
+        'motion_gate': motion_gate.stats() if motion_gate is not None else None,
+        'quality': quality_controller.stats() if quality_controller is not None else None,
+        'cost_limit': cost_limiter.stats() if cost_limiter is not None else None,
+        'recording': landmark_recorder.stats() if landmark_recorder is not None else None,
+        'idle_ttl': SESSION_IDLE_TTL,
+        'max_sessions': MAX_SESSIONS,
+        'evicted_total': session_sweeper.evicted_total,
+        'rss_bytes': _process_rss_bytes()
+    })
+
+
+def _too_large_response():
+    return jsonify({
+        'error': 'Request too large',
+        'max_bytes': MAX_VIDEO_BYTES
+    }), 413
 
 
 # Error handlers
+@app.errorhandler(413)
+def request_too_large(e):
+    return _too_large_response()
+
+
 @app.errorhandler(429)
 def ratelimit_handler(e):
     return jsonify({
@@ -264,6 +1269,75 @@ def internal_error(e):
     }), 500
 
 
+boot_timer.mark('app_setup')
+
+
+def _build_pose_pool():
+    """Build the configured pose pool and warm up every graph."""
+    if INFERENCE_WORKERS > 0:
+        with boot_timer.stage('pose_graphs'):
+            pool = InferenceWorkerPool(
+                workers=INFERENCE_WORKERS,
+                graphs_per_worker=POSE_POOL_SIZE,
+                detector_kwargs=POSE_DETECTOR_OPTIONS
+            )
+        # Each worker process builds and warms up its own graphs
+        with boot_timer.stage('warm_up'):
+            pool.wait_ready()
+    else:
+        with boot_timer.stage('pose_graphs'):
+            pool = PoseDetectorPool(size=POSE_POOL_SIZE, warm_up=False, **POSE_DETECTOR_OPTIONS)
+        with boot_timer.stage('warm_up'):
+            pool.warm_up()
+    return pool
+
+
+def start_inference(background=False):
+    """
+    Build and warm up the pose graphs, then mark the service ready.
+
+    Args:
+        background: Do it on a daemon thread and return at once; failures
+            are logged and leave /ready at 503
+    """
+    def _start():
+        global pose_pool
+        pose_pool = _build_pose_pool()
+        inference_ready.set()
+        logger.info('Service ready', extra={'boot': boot_timer.report()})
+
+    def _start_logged():
+        try:
+            _start()
+        except Exception:
+            logger.exception('Pose graph startup failed')
+
+    if background:
+        threading.Thread(target=_start_logged, name='inference-startup', daemon=True).start()
+    else:
+        _start()
+
+
+def start_worker():
+    """
+    Finish startup in a process forked from a preloaded gunicorn master.
+
+    Threads do not survive fork, so the log writer, session sweeper and
+    landmark recorder are started again. MediaPipe graphs run native
+    threads of their own, so they are built here, in each worker, rather
+    than in the master.
+    """
+    configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT)
+    session_sweeper.start()
+    if landmark_recorder is not None:
+        landmark_recorder.start()
+    start_inference(background=True)
+
+
+if INFERENCE_INIT != 'deferred':
+    start_inference(background=INFERENCE_INIT == 'background')
+
+
 if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,57 @@
+"""
+Boot Timing Module
+Wall-clock breakdown of service startup, stage by stage.
+
+Stages are either marked (the time since the previous mark, for import
+blocks at the top of a module) or timed with a context manager. The
+report is logged once the service is ready and served by /ready.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BootTimer:
+    """Collects named startup stage durations."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """Add seconds to a stage (stages of the same name accumulate)."""
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        """Record the time since the previous mark (or creation) as a stage."""
+        now = time.perf_counter()
+        self.add(name, now - self._last_mark)
+        self._last_mark = now
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as a stage."""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - began)
+
+    def report(self):
+        """
+        Get the breakdown so far.
+
+        Returns:
+            dict: Milliseconds per stage, in the order first recorded, and
+                the total since the timer was created
+        """
+        with self._lock:
+            stages = {name: round(seconds * 1000, 1) for name, seconds in self._stages.items()}
+        return {
+            'stages_ms': stages,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 1)
+        }
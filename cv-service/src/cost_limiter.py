@@ -0,0 +1,237 @@
+"""
+Cost Limiter Module
+Token-bucket rate limiting charged in units of work rather than requests.
+
+Each client key (a session or user) owns a bucket that refills at
+`rate` units per second up to `burst`. A request is admitted while its
+bucket is not empty and is charged its actual cost afterwards: either
+the milliseconds of decode/inference/encode work it caused, or the
+number of frames it carried. An expensive request can drive the bucket
+into debt, which delays that client's next request instead of anyone
+else's.
+
+The SQLite backend keeps buckets in one database file, so all gunicorn
+workers on a host charge the same buckets. Point COST_LIMIT_PATH at
+/dev/shm to keep it in shared memory.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+COST_UNITS = ('ms', 'frames')
+
+# Seconds between sweeps of refilled (and so redundant) buckets
+_PRUNE_INTERVAL = 60.0
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class BucketStore(ABC):
+    """Abstract base class for token bucket storage."""
+
+    @abstractmethod
+    def peek(self, key, now, rate, burst):
+        """Get a bucket's current tokens without changing it."""
+
+    @abstractmethod
+    def charge(self, key, cost, now, rate, burst):
+        """Refill a bucket, take cost tokens from it and return what is left."""
+
+    @abstractmethod
+    def prune(self, now, rate, burst):
+        """Drop buckets that have refilled completely; returns how many."""
+
+    @abstractmethod
+    def bucket_count(self):
+        """Number of buckets held."""
+
+
+class InProcessBuckets(BucketStore):
+    """Buckets in a dict; only correct with a single gunicorn worker."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def peek(self, key, now, rate, burst):
+        with self._lock:
+            bucket = self._buckets.get(key)
+        return burst if bucket is None else _refill(*bucket, now, rate, burst)
+
+    def charge(self, key, cost, now, rate, burst):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = burst if bucket is None else _refill(*bucket, now, rate, burst)
+            tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return tokens
+
+    def prune(self, now, rate, burst):
+        with self._lock:
+            full = [
+                key for key, bucket in self._buckets.items()
+                if _refill(*bucket, now, rate, burst) >= burst
+            ]
+            for key in full:
+                del self._buckets[key]
+        return len(full)
+
+    def bucket_count(self):
+        with self._lock:
+            return len(self._buckets)
+
+
+class SQLiteBuckets(BucketStore):
+    """Buckets in a SQLite database shared by the worker processes of a host."""
+
+    def __init__(self, path):
+        """
+        Open (and create if needed) the bucket database.
+
+        Args:
+            path: Database file path, e.g. /dev/shm/fitform_limits.db
+        """
+        self.path = path
+        self._local = threading.local()
+        # A connection must not be used across fork (gunicorn preload_app);
+        # forked workers open their own
+        os.register_at_fork(after_in_child=self._forget_connections)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            ' key TEXT PRIMARY KEY,'
+            ' tokens REAL NOT NULL,'
+            ' updated_at REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        """One connection per thread; sqlite3 connections are not thread-safe."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def peek(self, key, now, rate, burst):
+        row = self._connection().execute(
+            'SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)
+        ).fetchone()
+        return burst if row is None else _refill(*row, now, rate, burst)
+
+    def charge(self, key, cost, now, rate, burst):
+        # A single upsert refills and charges atomically, so concurrent
+        # charges from several processes all land
+        row = self._connection().execute(
+            'INSERT INTO buckets VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            ' tokens = MIN(?, tokens + MAX(0, ? - updated_at) * ?) - ?,'
+            ' updated_at = MAX(updated_at, ?) '
+            'RETURNING tokens',
+            (key, burst - cost, now, burst, now, rate, cost, now)
+        ).fetchone()
+        return row[0]
+
+    def prune(self, now, rate, burst):
+        cursor = self._connection().execute(
+            'DELETE FROM buckets WHERE tokens + (? - updated_at) * ? >= ?', (now, rate, burst)
+        )
+        return cursor.rowcount
+
+    def bucket_count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+
+class CostLimiter:
+    """
+    Admits requests per key while their token bucket has tokens left.
+
+    check() before doing the work, charge() with its cost afterwards.
+    """
+
+    def __init__(self, store, rate, burst, unit='ms'):
+        """
+        Initialize the limiter.
+
+        Args:
+            store: BucketStore holding the buckets
+            rate: Units refilled per second
+            burst: Bucket capacity, the most a key can spend at once
+            unit: 'ms' (milliseconds of work) or 'frames'
+        """
+        if unit not in COST_UNITS:
+            raise ValueError(f'Cost unit must be one of {list(COST_UNITS)}')
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.unit = unit
+        self.rejected_total = 0
+        self._last_prune = time.time()
+
+    def check(self, key):
+        """
+        Tell whether a key may make a request now.
+
+        Returns:
+            float: 0 if admitted, else seconds until the bucket has tokens again
+        """
+        tokens = self.store.peek(key, time.time(), self.rate, self.burst)
+        if tokens > 0:
+            return 0.0
+        self.rejected_total += 1
+        # Refill until strictly positive; at least a millisecond
+        return max(0.001, -tokens / self.rate)
+
+    def charge(self, key, cost):
+        """
+        Take the cost of a finished request from a key's bucket.
+
+        Returns:
+            float: Tokens left, negative while the key is in debt
+        """
+        now = time.time()
+        tokens = self.store.charge(key, cost, now, self.rate, self.burst)
+        if now - self._last_prune > _PRUNE_INTERVAL:
+            self._last_prune = now
+            self.store.prune(now, self.rate, self.burst)
+        return tokens
+
+    def stats(self):
+        """Get the configuration, bucket count and rejections of this process."""
+        return {
+            'unit': self.unit,
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'buckets': self.store.bucket_count(),
+            'rejected_total': self.rejected_total
+        }
+
+
+def create_bucket_store(backend=None, path=None):
+    """
+    Build the bucket store selected by configuration.
+
+    Args:
+        backend: 'memory' or 'sqlite' (defaults to COST_LIMIT_STORE, then
+            SESSION_STORE, then 'memory')
+        path: SQLite file (defaults to COST_LIMIT_PATH)
+    """
+    backend = (
+        backend or os.environ.get('COST_LIMIT_STORE') or os.environ.get('SESSION_STORE', 'memory')
+    ).lower()
+    if backend == 'memory':
+        return InProcessBuckets()
+    if backend == 'sqlite':
+        path = path or os.environ.get('COST_LIMIT_PATH', '/tmp/fitform_limits.db')
+        return SQLiteBuckets(path)
+    raise ValueError(f"Unknown cost limit store backend: {backend}")
@@ -0,0 +1,172 @@
+"""
+Pose Detector Pool Module
+Bounded pool of pre-warmed PoseDetector graphs with per-session affinity.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pose_detector import PoseDetector
+from synthetic_frame import draw_figure
+
+
+class _Slot:
+    """A single pooled PoseDetector and its ownership bookkeeping."""
+
+    def __init__(self, index, detector):
+        self.index = index
+        self.detector = detector
+        self.session_id = None
+        self.in_use = False
+        self.last_used = 0.0
+
+
+class PoseDetectorPool:
+    """
+    A fixed-size pool of PoseDetector instances.
+
+    Each session is pinned to one slot so MediaPipe's tracking state
+    (static_image_mode=False) only ever sees frames from a single user.
+    When a session without a slot arrives, the least recently used idle
+    slot is reassigned to it and its graph is reset.
+    """
+
+    def __init__(self, size=4, warm_up=True, **detector_kwargs):
+        """
+        Initialize the pool.
+
+        Args:
+            size: Number of PoseDetector graphs to keep
+            warm_up: Run one inference per graph so the first real frame is fast
+            detector_kwargs: Extra arguments passed to each PoseDetector
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.size = size
+        self._slots = [_Slot(i, PoseDetector(**detector_kwargs)) for i in range(size)]
+        # session_id -> slot index, ordered from least to most recently used
+        self._affinity = OrderedDict()
+        self._cond = threading.Condition()
+
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self, shape=(480, 640, 3)):
+        """
+        Run synthetic frames through every graph and clear its tracking state.
+
+        The frames show a person, so the landmark model and the tracked
+        (cropped) path run too, not just the person detector.
+        """
+        height, width = shape[:2]
+        frames = [draw_figure(width, height, bend) for bend in (0.0, 0.5, 1.0)]
+        for slot in self._slots:
+            for frame in frames:
+                slot.detector.detect(frame)
+            slot.detector.reset()
+
+    def _pick_slot(self):
+        """Return an idle slot for a new session, preferring unowned then LRU."""
+        idle = [slot for slot in self._slots if not slot.in_use]
+        if not idle:
+            return None
+        unowned = [slot for slot in idle if slot.session_id is None]
+        if unowned:
+            return unowned[0]
+        return min(idle, key=lambda slot: slot.last_used)
+
+    def checkout(self, session_id, timeout=None):
+        """
+        Check out the PoseDetector pinned to a session.
+
+        Blocks until the session's slot (or, for a new session, any idle
+        slot) is available.
+
+        Args:
+            session_id: Session identifier to pin the graph to
+            timeout: Maximum seconds to wait, or None to wait forever
+
+        Returns:
+            PoseDetector instance owned by the session
+
+        Raises:
+            TimeoutError: If no graph became available in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                index = self._affinity.get(session_id)
+                if index is not None:
+                    slot = self._slots[index]
+                    if not slot.in_use:
+                        break
+                else:
+                    slot = self._pick_slot()
+                    if slot is not None:
+                        self._assign(slot, session_id)
+                        break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No pose detector available")
+                self._cond.wait(remaining)
+
+            slot.in_use = True
+            self._affinity.move_to_end(session_id)
+            return slot.detector
+
+    def _assign(self, slot, session_id):
+        """Pin a slot to a new session, dropping the previous owner."""
+        if slot.session_id is not None:
+            self._affinity.pop(slot.session_id, None)
+            slot.detector.reset()
+        slot.session_id = session_id
+        self._affinity[session_id] = slot.index
+
+    def checkin(self, session_id):
+        """Return a session's PoseDetector to the pool."""
+        with self._cond:
+            index = self._affinity.get(session_id)
+            if index is None:
+                return
+            slot = self._slots[index]
+            slot.in_use = False
+            slot.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    @contextmanager
+    def session(self, session_id, timeout=None):
+        """Context manager wrapping checkout/checkin for a session."""
+        detector = self.checkout(session_id, timeout=timeout)
+        try:
+            yield detector
+        finally:
+            self.checkin(session_id)
+
+    def release(self, session_id):
+        """Unpin a session so its graph can be handed to someone else."""
+        with self._cond:
+            index = self._affinity.get(session_id)
+            if index is None:
+                return
+            slot = self._slots[index]
+            if slot.in_use:
+                # Still being used by an in-flight request; let LRU reclaim it later
+                return
+            del self._affinity[session_id]
+            slot.session_id = None
+            slot.detector.reset()
+            self._cond.notify_all()
+
+    def stats(self):
+        """Get pool occupancy for debugging."""
+        with self._cond:
+            return {
+                'size': self.size,
+                'in_use': sum(1 for slot in self._slots if slot.in_use),
+                'pinned_sessions': len(self._affinity)
+            }
@@ -1,37 +1,341 @@
 """
 Exercise Detectors Module
-Contains exercise-specific detection classes for push-ups, squats, and sit-ups.
+Table-driven exercise detection for push-ups, squats, sit-ups and lunges.
+
+Each exercise is a row of EXERCISES: the joint angle that counts reps,
+its thresholds, the angles and landmarks it needs, the angles it
+reports and its form feedback rules. register_exercise compiles a row
+once, and one ExerciseDetector class evaluates every compiled exercise:
+all angles a frame needs come from a single joint_angles call (served
+from the precomputed cache for LandmarkSequence frames), then the rep
+counter and feedback rules run on them. Adding an exercise means adding
+a row, not a class.
+
+detect_sequence scores a whole recorded (frames, 33, 4) sequence at
+once: angles for all frames in one vectorized pass, then the rep
+counter's state machine as array operations (see count_sequence).
 """
 
-import os
-from abc import ABC, abstractmethod
-from pose_detector import PoseDetector
+import logging
+
+import numpy as np
+
+from joint_angles import compute_joint_angles
+from landmark_frame import JOINT_TRIPLETS, LANDMARK_INDEX, MIRROR_INDEX, NUM_LANDMARKS
+from rep_counter import ThresholdCounter, count_sequence
+
+logger = logging.getLogger(__name__)
+
+# Exercise definitions, keyed by exercise type.
+#
+#   angle            Joint angle (see JOINT_TRIPLETS) that counts reps; a
+#                    rep is that angle going from above `high` to below `low`
+#   high, low        Counting thresholds in degrees; the band between them
+#                    is the hysteresis that keeps noise from counting
+#   high_stage,      Stage reported in each zone (default 'up' / 'down')
+#   low_stage
+#   requires         Other angles and landmarks that must be visible
+#   low_gate         Landmark whose y must exceed min_y to enter the low zone
+#   report           Response field -> angle; exercises that report angles
+#                    also report posture_ok
+#   missing          Feedback when a required point is not visible
+#   feedback         Rules checked in order, first match wins: optional
+#                    angle with above/below bounds (exclusive) and stage
+#   default_feedback Feedback when no rule matches (default 'Good form!')
+EXERCISES = {
+    'pushup': {
+        'name': 'Push-up',
+        'description': 'Upper body exercise targeting chest, shoulders, and triceps',
+        'calories_per_rep': 0.35,
+        # Calibrated for side-view camera angle
+        # Based on actual user data: up=75-85°, down=40-50°
+        'angle': 'left_elbow',
+        'high': 70,  # Arms relatively straight (from camera's perspective)
+        'low': 55,   # Arms bent (going low)
+        'requires': {'angles': ['left_body_line']},
+        'report': {'elbow_angle': 'left_elbow', 'body_angle': 'left_body_line'},
+        'missing': 'Cannot detect body',
+        'feedback': [
+            {'angle': 'left_elbow', 'above': 70, 'message': 'Arms extended - go down'},
+            {'angle': 'left_elbow', 'below': 55, 'message': 'Good depth!'},
+        ],
+        'default_feedback': 'Keep going',
+    },
+    'squat': {
+        'name': 'Squat',
+        'description': 'Lower body exercise targeting quadriceps, hamstrings, and glutes',
+        'calories_per_rep': 0.32,
+        'angle': 'left_knee',
+        'high': 160,  # Standing
+        'low': 100,   # Squatting
+        'requires': {'landmarks': ['LEFT_SHOULDER']},
+        'missing': 'Cannot detect legs. Please adjust camera.',
+    },
+    'situp': {
+        'name': 'Sit-up',
+        'description': 'Core exercise targeting abdominal muscles',
+        'calories_per_rep': 0.25,
+        # Hip angle (shoulder-hip-knee); lying flat is the high zone,
+        # sitting up (the counted end) the low one
+        'angle': 'left_hip',
+        'high': 120,
+        'low': 80,
+        'high_stage': 'down',
+        'low_stage': 'up',
+        'missing': 'Cannot detect torso. Please adjust camera.',
+        'feedback': [
+            {'angle': 'left_hip', 'above': 80, 'below': 120, 'stage': 'down',
+             'message': 'Lean forward more to complete rep'},
+        ],
+    },
+    'lunge': {
+        'name': 'Lunge',
+        'description': 'Lower body exercise targeting quadriceps, glutes, and hamstrings',
+        'calories_per_rep': 0.3,
+        # Front (left) knee; standing is above 170°, a deep lunge 70-100°
+        'angle': 'left_knee',
+        'high': 170,
+        'low': 100,
+        # Require some depth so a standing shuffle does not count
+        'low_gate': {'landmark': 'LEFT_HIP', 'min_y': 0.5},
+        'missing': 'Cannot detect legs. Please adjust camera.',
+        'feedback': [
+            {'stage': 'down', 'message': 'Back to start'},
+        ],
+        'default_feedback': 'Step into lunge',
+    },
+}
+
+
+def _with_mirror(name):
+    """Index of a landmark and of its opposite-side fallback (itself if none)."""
+    index = LANDMARK_INDEX[name]
+    mirror = MIRROR_INDEX[index]
+    return index, index if mirror is None else mirror
+
+
+class CompiledExercise:
+    """An EXERCISES row validated and flattened for per-frame evaluation."""
+
+    def __init__(self, exercise_type, spec):
+        """
+        Compile an exercise definition.
+
+        Args:
+            exercise_type: Key used by get_detector and in serialized records
+            spec: Definition in the EXERCISES format
+
+        Raises:
+            ValueError: If the definition names unknown angles or landmarks
+                or its thresholds are out of order
+        """
+        self.exercise_type = exercise_type
+        self.name = spec.get('name', exercise_type.title())
+        self.description = spec.get('description', '')
+        self.calories_per_rep = spec.get('calories_per_rep', 0.0)
+
+        self.angle = spec['angle']
+        self.low = spec['low']
+        self.high = spec['high']
+        if not self.low < self.high:
+            raise ValueError(f'{exercise_type}: low threshold must be below the high threshold')
+        self.high_stage = spec.get('high_stage', 'up')
+        self.low_stage = spec.get('low_stage', 'down')
+
+        requires = spec.get('requires', {})
+        self.report = tuple(spec.get('report', {}).items())
+        rules = spec.get('feedback', [])
+        self.rules = tuple(
+            (rule.get('angle'), rule.get('above'), rule.get('below'), rule.get('stage'), rule['message'])
+            for rule in rules
+        )
+
+        # Every angle the exercise reads, in one tuple for one joint_angles call
+        angles = [self.angle, *requires.get('angles', ()), *(name for _, name in self.report),
+                  *(rule['angle'] for rule in rules if rule.get('angle'))]
+        self.angles = tuple(dict.fromkeys(angles))
+        self.landmarks = tuple(requires.get('landmarks', ()))
+
+        gate = spec.get('low_gate')
+        self.gate = (gate['landmark'], gate['min_y']) if gate else None
+
+        unknown = [name for name in self.angles if name not in JOINT_TRIPLETS]
+        unknown += [
+            name for name in self.landmarks + ((self.gate[0],) if self.gate else ())
+            if name not in LANDMARK_INDEX
+        ]
+        if unknown:
+            raise ValueError(f'{exercise_type}: unknown angles or landmarks {unknown}')
+        self._landmark_indices = [_with_mirror(name) for name in self.landmarks]
+
+        self.missing = spec.get('missing', 'Cannot detect body')
+        self.default_feedback = spec.get('default_feedback', 'Good form!')
+
+    def detect_sequence(self, landmarks, timestamps=None, visibility_threshold=0.5):
+        """
+        Count reps over a whole sequence of frames, vectorized.
+
+        Gives the same counts and zones as a fresh ExerciseDetector fed
+        the frames one at a time; frames where a required point is not
+        visible are skipped just as detect() skips them.
+
+        Args:
+            landmarks: (frames, 33, C) array whose first two columns are
+                x, y and last is visibility; all-zero rows for no person
+            timestamps: (frames,) times in seconds, or None
+            visibility_threshold: Minimum visibility to trust a point
 
+        Returns:
+            dict: Final count and calories, the running count (frames,)
+                and zone code (frames,) after each frame, the times of
+                the counted reps and the mask of frames that were scored
+        """
+        landmarks = np.asarray(landmarks).reshape(-1, NUM_LANDMARKS, np.shape(landmarks)[-1])
+        angles = compute_joint_angles(landmarks, self.angles, visibility_threshold)
+        valid = ~np.isnan(angles).any(axis=1)
+
+        visibility = landmarks[..., -1] >= visibility_threshold
+        for index, mirror in self._landmark_indices:
+            valid &= visibility[:, index] | visibility[:, mirror]
+
+        allow_low = None
+        if self.gate is not None:
+            index, mirror = _with_mirror(self.gate[0])
+            y = np.where(visibility[:, index], landmarks[:, index, 1], landmarks[:, mirror, 1])
+            allow_low = ((visibility[:, index] | visibility[:, mirror]) & (y > self.gate[1]))[valid]
+
+        counts, zones, rep_times = count_sequence(
+            angles[valid, self.angles.index(self.angle)],
+            None if timestamps is None else np.asarray(timestamps, dtype=np.float64)[valid],
+            self.low, self.high, allow_low
+        )
+
+        # Skipped frames keep the count and zone of the last scored one;
+        # position 0 stands for "nothing scored yet"
+        last_scored = np.cumsum(valid)
+        counts = np.concatenate(([0], counts))
+        zones = np.concatenate(([0], zones)).astype(np.int8)
+        count = int(counts[-1])
+        return {
+            'exercise_type': self.exercise_type,
+            'count': count,
+            'calories_burned': round(count * self.calories_per_rep, 2),
+            'counts': counts[last_scored],
+            'zones': zones[last_scored],
+            'rep_times': rep_times,
+            'valid': valid
+        }
+
+    def details(self):
+        """Get the public description served by /api/exercises."""
+        return {
+            'name': self.name,
+            'calories_per_rep': self.calories_per_rep,
+            'description': self.description
+        }
+
+
+class ExerciseDetector:
+    """
+    Detects one exercise from a compiled definition.
 
-class ExerciseDetector(ABC):
-    """Abstract base class for exercise detection."""
-    
-    def __init__(self):
+    Reps are counted on the definition's angle by a ThresholdCounter: a
+    rep is the angle going from above the high threshold (high_stage) to
+    below the low threshold (low_stage). Frame timestamps let the counter
+    interpolate crossings that fall between frames.
+    """
+
+    def __init__(self, exercise):
+        """
+        Initialize the detector.
+
+        Args:
+            exercise: CompiledExercise to evaluate
+        """
+        self.exercise = exercise
+        self.exercise_type = exercise.exercise_type
+        self.calories_per_rep = exercise.calories_per_rep
         self.count = 0
         self.stage = None
         self.feedback = []
-        self.calories_per_rep = 0.0
-        
-    @abstractmethod
-    def detect(self, pose_detector) -> dict:
-        """Detect exercise and update count."""
-        pass
-    
+        self.counter = ThresholdCounter(exercise.low, exercise.high)
+
+    def detect(self, pose_detector, timestamp=None) -> dict:
+        """
+        Detect the exercise and update count.
+
+        Args:
+            pose_detector: PoseDetector or LandmarkFrame with the frame's landmarks
+            timestamp: Frame time in seconds, if known
+
+        Returns:
+            dict: Detector state plus the exercise's reported angles
+        """
+        exercise = self.exercise
+        angles = pose_detector.joint_angles(exercise.angles)
+
+        if (None in angles.values()
+                or any(pose_detector.get_landmark(name) is None for name in exercise.landmarks)):
+            self.feedback = [exercise.missing]
+            state = self.get_state()
+            if exercise.report:
+                for field, _ in exercise.report:
+                    state[field] = 0
+                state['posture_ok'] = False
+            return state
+
+        allow_low = True
+        if exercise.gate is not None:
+            point = pose_detector.get_landmark(exercise.gate[0])
+            allow_low = point is not None and point[1] > exercise.gate[1]
+
+        angle = angles[exercise.angle]
+        if self._count(angle, timestamp, allow_low):
+            logger.debug('Rep counted', extra={
+                'exercise': self.exercise_type, 'count': self.count, 'angle': angle
+            })
+
+        self.feedback = [self._feedback(angles)]
+
+        state = self.get_state()
+        if exercise.report:
+            for field, name in exercise.report:
+                state[field] = round(angles[name], 2)
+            state['posture_ok'] = True
+        return state
+
+    def _count(self, angle, timestamp, allow_low=True):
+        """Feed the counting angle to the rep counter and update count and stage."""
+        counted = self.counter.update(angle, timestamp, allow_low)
+        self.count += counted
+        if self.counter.zone is not None:
+            exercise = self.exercise
+            self.stage = exercise.high_stage if self.counter.zone == 'high' else exercise.low_stage
+        return counted
+
+    def _feedback(self, angles):
+        """Get the message of the first feedback rule matching this frame."""
+        for name, above, below, stage, message in self.exercise.rules:
+            if stage is not None and self.stage != stage:
+                continue
+            if name is not None:
+                angle = angles[name]
+                if (above is not None and angle <= above) or (below is not None and angle >= below):
+                    continue
+            return message
+        return self.exercise.default_feedback
+
     def reset(self):
         """Reset the counter and stage."""
         self.count = 0
         self.stage = None
         self.feedback = []
-        
+        self.counter.reset()
+
     def get_calories(self):
         """Calculate calories burned."""
         return round(self.count * self.calories_per_rep, 2)
-    
+
     def get_state(self):
         """Get current state of the detector."""
         return {
@@ -41,183 +345,107 @@ class ExerciseDetector(ABC):
             'calories_burned': self.get_calories()
         }
 
-
-class PushupDetector(ExerciseDetector):
-    """Detector for push-up exercises."""
-    
-    def __init__(self):
-        super().__init__()
-        self.calories_per_rep = 0.35
-        self.stage = None  # "up" / "down"
-        
-    def detect(self, pose_detector) -> dict:
+    def to_record(self):
         """
-        Detect push-up and count reps.
-        Simple detection based on elbow angle only.
+        Serialize the counting state to a compact dict.
+
+        Calories are derived from the count and feedback is rebuilt on
+        every frame, so only the state machine itself is stored.
         """
-        self.feedback = []
+        return {'c': self.count, 's': self.stage, 't': self.counter.to_record()}
 
-        # Get landmarks
-        shoulder = pose_detector.get_landmark('LEFT_SHOULDER')
-        elbow = pose_detector.get_landmark('LEFT_ELBOW')
-        wrist = pose_detector.get_landmark('LEFT_WRIST')
-        hip = pose_detector.get_landmark('LEFT_HIP')
-        ankle = pose_detector.get_landmark('LEFT_ANKLE')
+    def load_record(self, record):
+        """Restore state produced by to_record."""
+        self.count = record.get('c', 0)
+        self.stage = record.get('s')
+        if 't' in record:
+            self.counter.load_record(record['t'])
+        else:
+            # Records written before the rep counter kept its own state
+            exercise = self.exercise
+            zone = {exercise.high_stage: 'high', exercise.low_stage: 'low'}.get(self.stage)
+            self.counter.reset(zone)
+        return self
 
-        if not all([shoulder, elbow, wrist, hip, ankle]):
-            self.feedback.append("Cannot detect body")
-            state = self.get_state()
-            state['elbow_angle'] = 0
-            state['body_angle'] = 0
-            state['posture_ok'] = False
-            return state
 
-        # Calculate elbow angle
-        elbow_angle = pose_detector.calculate_angle(shoulder, elbow, wrist)
-        body_angle = pose_detector.calculate_angle(shoulder, hip, ankle)
-        
-        # Thresholds calibrated for side-view camera angle
-        # Based on actual user data: up=75-85°, down=40-50°
-        UP_THRESHOLD = 70    # Arms relatively straight (from camera's perspective)
-        DOWN_THRESHOLD = 55  # Arms bent (going low)
-        
-        # State machine for counting
-        if elbow_angle > UP_THRESHOLD:
-            self.stage = "up"
-            self.feedback.append("Arms extended - go down")
-        elif elbow_angle < DOWN_THRESHOLD:
-            if self.stage == "up":
-                self.count += 1
-                print(f"REP COUNTED! Total: {self.count}, angle was: {elbow_angle}")
-            self.stage = "down"
-            self.feedback.append("Good depth!")
-        else:
-            self.feedback.append("Keep going")
+# Compiled EXERCISES, filled by register_exercise
+_COMPILED = {}
 
-        state = self.get_state()
-        state['elbow_angle'] = round(elbow_angle, 2)
-        state['body_angle'] = round(body_angle, 2)
-        state['posture_ok'] = True
-        return state
+# List of supported exercises
+SUPPORTED_EXERCISES = []
 
 
-class SquatDetector(ExerciseDetector):
-    """Detector for squat exercises."""
-    
-    def __init__(self):
-        super().__init__()
-        self.calories_per_rep = 0.32
-        
-    def detect(self, pose_detector):
-        """
-        Detect squat and count reps.
-        
-        Squat detection:
-        - Up position: Knee angle > 160°
-        - Down position: Knee angle < 100°
-        - Form check: Squat depth and back angle
-        """
-        self.feedback = []
-        
-        # Get landmarks
-        hip = pose_detector.get_landmark('LEFT_HIP')
-        knee = pose_detector.get_landmark('LEFT_KNEE')
-        ankle = pose_detector.get_landmark('LEFT_ANKLE')
-        shoulder = pose_detector.get_landmark('LEFT_SHOULDER')
-        
-        if not all([hip, knee, ankle, shoulder]):
-            self.feedback.append("Cannot detect legs. Please adjust camera.")
-            return self.get_state()
-        
-        # Calculate knee angle
-        knee_angle = pose_detector.calculate_angle(hip, knee, ankle)
-        if knee_angle > 160:
-            self.stage = "up"
-            
-        # Down position (squatting) - count rep when going down from up
-        if knee_angle < 100:
-            if self.stage == "up":
-                self.stage = "down"
-                self.count += 1
-
-        if not self.feedback:
-            self.feedback.append("Good form!")
-            
-        return self.get_state()
-
-
-class SitupDetector(ExerciseDetector):
-    """Detector for sit-up exercises."""
-    
-    def __init__(self):
-        super().__init__()
-        self.calories_per_rep = 0.25
-        
-    def detect(self, pose_detector):
-        """
-        Detect sit-up and count reps.
-        
-        Sit-up detection:
-        - Down position: Hip angle > 120° (lying flat)
-        - Up position: Hip angle < 80° (sitting up)
-        """
-        self.feedback = []
-        
-        # Get landmarks
-        shoulder = pose_detector.get_landmark('LEFT_SHOULDER')
-        hip = pose_detector.get_landmark('LEFT_HIP')
-        knee = pose_detector.get_landmark('LEFT_KNEE')
-        
-        if not all([shoulder, hip, knee]):
-            self.feedback.append("Cannot detect torso. Please adjust camera.")
-            return self.get_state()
-        
-        # Calculate hip angle
-        hip_angle = pose_detector.calculate_angle(shoulder, hip, knee)
-        
-        # Down position (lying flat)
-        if hip_angle > 120:
-            self.stage = "down"
-            
-        # Up position (sitting up) - count rep when reaching up
-        if hip_angle < 80:
-            if self.stage == "down":
-                self.stage = "up"
-                self.count += 1
-                
-        # Form feedback
-        if hip_angle > 80 and hip_angle < 120:
-            if self.stage == "down":
-                self.feedback.append("Lean forward more to complete rep")
-                
-        if not self.feedback:
-            self.feedback.append("Good form!")
-            
-        return self.get_state()
+def register_exercise(exercise_type, spec):
+    """
+    Compile an exercise definition and make it available to get_detector.
+
+    Args:
+        exercise_type: Key used by get_detector and in serialized records
+        spec: Definition in the EXERCISES format
+
+    Returns:
+        CompiledExercise: The compiled definition
+
+    Raises:
+        ValueError: If the definition is invalid
+    """
+    exercise_type = exercise_type.lower()
+    compiled = _COMPILED[exercise_type] = CompiledExercise(exercise_type, spec)
+    EXERCISES[exercise_type] = spec
+    if exercise_type not in SUPPORTED_EXERCISES:
+        SUPPORTED_EXERCISES.append(exercise_type)
+    return compiled
+
+
+def exercise_details():
+    """Get name, calories per rep and description of every supported exercise."""
+    return {exercise_type: _COMPILED[exercise_type].details() for exercise_type in SUPPORTED_EXERCISES}
 
 
 # Factory function to get detector by exercise type
 def get_detector(exercise_type):
     """
     Factory function to get the appropriate detector.
-    
+
     Args:
-        exercise_type: Type of exercise ('pushup', 'squat', 'situp')
-        
+        exercise_type: One of SUPPORTED_EXERCISES
+
     Returns:
-        ExerciseDetector instance
+        ExerciseDetector instance, or None for an unknown exercise type
     """
-    detectors = {
-        'pushup': PushupDetector,
-        'squat': SquatDetector,
-        'situp': SitupDetector
-    }
-    
-    detector_class = detectors.get(exercise_type.lower())
-    if detector_class:
-        return detector_class()
+    exercise = _COMPILED.get(exercise_type.lower())
+    if exercise:
+        return ExerciseDetector(exercise)
     return None
 
 
-# List of supported exercises
-SUPPORTED_EXERCISES = ['pushup', 'squat', 'situp']
+def detect_sequence(exercise_type, landmarks, timestamps=None):
+    """
+    Count reps of an exercise over a whole recorded sequence.
+
+    See CompiledExercise.detect_sequence.
+
+    Raises:
+        ValueError: If the exercise type is not supported
+    """
+    exercise = _COMPILED.get(exercise_type.lower())
+    if exercise is None:
+        raise ValueError(f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}')
+    return exercise.detect_sequence(landmarks, timestamps)
+
+
+def detector_from_record(exercise_type, record):
+    """
+    Rebuild a detector from a record produced by ExerciseDetector.to_record.
+
+    Returns:
+        ExerciseDetector instance, or None for an unknown exercise type
+    """
+    detector = get_detector(exercise_type)
+    if detector is not None and record:
+        detector.load_record(record)
+    return detector
+
+
+for _exercise_type, _spec in list(EXERCISES.items()):
+    register_exercise(_exercise_type, _spec)
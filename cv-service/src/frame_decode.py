@@ -0,0 +1,100 @@
+"""
+Frame Decode Module
+Decodes uploaded frames no larger than inference needs.
+
+JPEG can be decoded at 1/2, 1/4 or 1/8 scale straight from the DCT
+coefficients, which is much cheaper than decoding at full size and
+resizing afterwards. The frame size is read from the JPEG header so the
+reduction never drops a frame below the pose detector's input size.
+"""
+
+import struct
+
+import cv2
+import numpy as np
+
+# Reduced-scale decode flags, largest reduction first
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers (baseline, progressive, ...) that carry the size
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data):
+    """
+    Read the width and height of a JPEG from its header.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        tuple: (width, height), or None if data is not a readable JPEG
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+
+    offset = 2
+    end = len(data)
+    while offset + 4 <= end:
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # Standalone markers have no length field
+            offset += 2
+            continue
+        (length,) = struct.unpack('>H', data[offset + 2:offset + 4])
+        if marker in _SOF_MARKERS:
+            if offset + 9 > end:
+                return None
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def reduced_decode_flag(width, height, target_size):
+    """
+    Pick the strongest reduced decode that keeps the longest side >= target_size.
+
+    Returns:
+        int: cv2.IMREAD_* flag
+    """
+    longest = max(width, height)
+    for factor, flag in _REDUCED_FLAGS:
+        if longest // factor >= target_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_frame(data, target_size=0):
+    """
+    Decode encoded image bytes (JPEG/WebP/PNG) to a BGR image.
+
+    Args:
+        data: Encoded image bytes
+        target_size: Longest side the caller needs; larger JPEGs are
+            decoded at reduced scale (0 = always full size)
+
+    Returns:
+        np.ndarray: BGR image, or None if the data could not be decoded
+    """
+    # frombuffer wraps the bytes without copying them
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+
+    flag = cv2.IMREAD_COLOR
+    if target_size:
+        size = jpeg_size(data)
+        if size is not None:
+            flag = reduced_decode_flag(size[0], size[1], target_size)
+    return cv2.imdecode(buffer, flag)
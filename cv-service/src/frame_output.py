@@ -0,0 +1,123 @@
+"""
+Frame Output Module
+Builds the per-frame pose payload a client asked for.
+
+Rendering and JPEG-encoding an annotated frame costs about as much CPU
+as everything but inference and dominates response size, so clients
+choose what they need:
+
+    none       counting state only
+    landmarks  normalized [x, y, visibility] points plus the skeleton
+               connections, for drawing on the client
+    jpeg       server-rendered overlay as a JPEG data URL, with
+               configurable quality and scale
+"""
+
+import base64
+
+import cv2
+import numpy as np
+
+from landmark_frame import POSE_CONNECTIONS, draw_landmarks
+
+OUTPUT_MODES = ('none', 'landmarks', 'jpeg')
+
+DEFAULT_JPEG_QUALITY = 80
+DEFAULT_JPEG_SCALE = 1.0
+
+# Three decimals is sub-pixel for any webcam resolution
+_LANDMARK_DECIMALS = 3
+
+
+def _is_true(value):
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def parse_output_options(options):
+    """
+    Read the output options of a detect request.
+
+    Requests that predate output_mode keep working: a true return_image
+    means jpeg and anything else means none.
+
+    Args:
+        options: Mapping with output_mode, jpeg_quality, jpeg_scale and/or
+            the legacy return_image
+
+    Returns:
+        dict: mode, quality and scale
+
+    Raises:
+        ValueError: If an option is out of range
+    """
+    mode = options.get('output_mode')
+    if not mode:
+        mode = 'jpeg' if _is_true(options.get('return_image', False)) else 'none'
+    mode = str(mode).lower()
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f'output_mode must be one of {list(OUTPUT_MODES)}')
+
+    # Only a missing option takes the default; 0 or '' must fail validation
+    quality = options.get('jpeg_quality')
+    scale = options.get('jpeg_scale')
+    try:
+        quality = DEFAULT_JPEG_QUALITY if quality is None else int(quality)
+        scale = DEFAULT_JPEG_SCALE if scale is None else float(scale)
+    except (TypeError, ValueError):
+        raise ValueError('jpeg_quality must be an integer and jpeg_scale a number')
+    if not 1 <= quality <= 100:
+        raise ValueError('jpeg_quality must be between 1 and 100')
+    if not 0.0 < scale <= 1.0:
+        raise ValueError('jpeg_scale must be greater than 0 and at most 1')
+
+    return {'mode': mode, 'quality': quality, 'scale': scale}
+
+
+def encode_landmarks(landmarks):
+    """
+    Encode a landmark array for client-side drawing.
+
+    Args:
+        landmarks: (33, 3) or (33, 4) array, or None if no person
+
+    Returns:
+        dict: "points" as 33 [x, y, visibility] rows (None if no person)
+            and "connections" as landmark index pairs
+    """
+    points = None
+    if landmarks is not None:
+        rows = np.asarray(landmarks, dtype=np.float64)[:, [0, 1, -1]]
+        points = np.round(rows, _LANDMARK_DECIMALS).tolist()
+    return {'points': points, 'connections': POSE_CONNECTIONS}
+
+
+def render_overlay(image, landmarks, scale=DEFAULT_JPEG_SCALE):
+    """
+    Draw the landmark overlay, scaling the frame down first.
+
+    A smaller preview also costs less to render. The image is drawn on in
+    place when not scaled.
+
+    Returns:
+        np.ndarray: The annotated image
+    """
+    if scale < 1.0:
+        height, width = image.shape[:2]
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return draw_landmarks(image, landmarks)
+
+
+def encode_jpeg(image, quality=DEFAULT_JPEG_QUALITY):
+    """
+    Encode an image as a JPEG data URL.
+
+    Returns:
+        str: data:image/jpeg;base64 URL, or None if encoding failed
+    """
+    success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        return None
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer).decode('ascii')
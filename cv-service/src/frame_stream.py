@@ -0,0 +1,64 @@
+"""
+Frame Stream Module
+Latest-frame-wins mailbox used by the WebSocket streaming endpoint.
+"""
+
+import threading
+
+
+class LatestFrameSlot:
+    """
+    A single-slot mailbox for incoming frames.
+
+    A frame that arrives while the previous one is still waiting replaces
+    it, so a busy consumer always processes the newest frame and stale
+    frames are dropped instead of queued.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, frame):
+        """
+        Offer a frame to the consumer.
+
+        Returns:
+            bool: True if a pending frame was replaced (dropped); frames
+                offered after close() are discarded and return False
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            replaced = self._frame is not None
+            if replaced:
+                self.dropped += 1
+            self._frame = frame
+            self._cond.notify()
+            return replaced
+
+    def get(self, timeout=None):
+        """
+        Take the newest pending frame, waiting until one arrives.
+
+        Returns:
+            The frame, or None if the slot was closed or the wait timed out
+        """
+        with self._cond:
+            if self._frame is None and not self._closed:
+                self._cond.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+    def close(self):
+        """Wake the consumer and stop accepting frames."""
+        with self._cond:
+            self._closed = True
+            self._frame = None
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
@@ -0,0 +1,37 @@
+"""
+Gunicorn Configuration
+Preloads the app in the master and warms up pose graphs in each worker.
+
+With preload_app the slow imports (MediaPipe, OpenCV, NumPy, Flask) and
+the module-level setup run once in the master, and forked workers share
+those pages copy-on-write instead of importing again. MediaPipe graphs
+run native threads that do not survive fork, so INFERENCE_INIT=deferred
+keeps them out of the master and post_worker_init builds and warms them
+up in each worker; /ready answers 503 until that is done.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# A single worker keeps session state in process memory (SESSION_STORE=memory).
+# For more set SESSION_STORE=sqlite and SESSION_STORE_PATH=/dev/shm/fitform_sessions.db
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Each open /api/stream WebSocket holds a thread, so keep more threads than pose graphs
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = 120
+
+preload_app = True
+
+# Applied to the environment before the app is preloaded
+raw_env = ['INFERENCE_INIT=deferred']
+
+
+def post_worker_init(worker):
+    """Restart background threads and start warming up this worker's graphs."""
+    import app
+    app.start_worker()
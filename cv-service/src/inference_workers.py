@@ -0,0 +1,431 @@
+"""
+Inference Workers Module
+Runs MediaPipe pose inference in separate worker processes.
+
+Each worker process owns its own PoseDetectorPool and a shared-memory
+ring of frame slots. The HTTP process copies a decoded frame into a free
+slot and sends only the slot index over a queue; the worker answers with
+the (33, 4) landmark array. Sessions are hashed to a fixed worker so
+tracking state always has a single owner, and a session's requests are
+serialized, so its frames reach the worker and come back in order.
+
+A slot is freed when the worker's answer arrives, even if the request
+has already timed out. A worker that has exited, or whose every slot has
+been held by a timed-out request for hang_timeout seconds, is restarted
+with all its slots free. Each worker answers on its own queue, so one
+killed mid-write cannot block the others' answers.
+"""
+
+import atexit
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from landmark_frame import LandmarkFrame
+from process_spawn import main_hidden
+
+# Largest frame a slot can hold; bigger frames are downscaled to fit
+DEFAULT_MAX_FRAME_SHAPE = (720, 1280, 3)
+
+_STOP = None
+
+# Error reported to requests that were in flight when their worker restarted
+_RESTARTED = 'worker restarted'
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(shm_name, slot_bytes, requests, responses, graphs, detector_kwargs):
+    """Entry point of an inference worker process."""
+    from detector_pool import PoseDetectorPool
+    from service_logging import configure_logging
+
+    # Spawned workers start with unconfigured logging; match the parent's
+    configure_logging(
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+        fmt=os.environ.get('LOG_FORMAT', 'json').lower()
+    )
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pool = PoseDetectorPool(size=graphs, **detector_kwargs)
+    try:
+        while True:
+            message = requests.get()
+            if message is _STOP:
+                break
+
+            kind, request_id, session_id, payload = message
+            if kind == 'release':
+                pool.release(session_id)
+                continue
+            if kind == 'ping':
+                # Reaching here means the pool is built and warmed up
+                responses.put((request_id, None, None))
+                continue
+
+            slot, shape, quality = payload
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            try:
+                with pool.session(session_id) as pose_detector:
+                    pose_detector.configure(**quality)
+                    result = pose_detector.detect(frame)
+                responses.put((request_id, (result, pose_detector.stage_seconds), None))
+            except Exception as e:
+                responses.put((request_id, None, repr(e)))
+            finally:
+                del frame
+    finally:
+        shm.close()
+
+
+class _Worker:
+    """Front-side handle for one worker process and its slot ring."""
+
+    def __init__(self, context, slots, slot_bytes, graphs, detector_kwargs, dispatch):
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.slots = slots
+        self.free_slots = queue.Queue()
+        self._context = context
+        self._args = (slot_bytes, graphs, detector_kwargs)
+        self._dispatch = dispatch
+        self.start()
+
+    def start(self):
+        """Start a fresh process on the slot ring, with every slot free."""
+        slot_bytes, graphs, detector_kwargs = self._args
+        # New queues: a killed process may have held the old ones' locks
+        self.requests = self._context.Queue()
+        self.responses = self._context.Queue()
+        while True:
+            try:
+                self.free_slots.get_nowait()
+            except queue.Empty:
+                break
+        for slot in range(self.slots):
+            self.free_slots.put(slot)
+        self.process = self._context.Process(
+            target=_worker_main,
+            args=(self.shm.name, slot_bytes, self.requests, self.responses, graphs, detector_kwargs),
+            daemon=True
+        )
+        with main_hidden():
+            self.process.start()
+        threading.Thread(target=self._dispatch, args=(self, self.responses), daemon=True).start()
+
+
+class RemotePoseDetector(LandmarkFrame):
+    """
+    PoseDetector stand-in that runs inference in a worker process.
+
+    detect() hands the frame to the session's worker and keeps the
+    returned landmark array, so exercise detectors and annotation use it
+    exactly like a local PoseDetector.
+    """
+
+    def __init__(self, pool, session_id, timeout=None):
+        super().__init__()
+        self._pool = pool
+        self._session_id = session_id
+        self._timeout = timeout
+        self._quality = {}
+        self.stage_seconds = {}
+
+    def configure(self, model_complexity=None, max_input_size=None):
+        """Choose the model and input size the worker uses for following frames."""
+        self._quality = {'model_complexity': model_complexity, 'max_input_size': max_input_size}
+
+    def detect(self, image):
+        """
+        Run pose inference on a BGR image in the session's worker.
+
+        Returns:
+            np.ndarray: (33, 4) landmark array, or None if no person found
+        """
+        self.landmarks, self.stage_seconds = self._pool.infer(
+            self._session_id, image, timeout=self._timeout, quality=self._quality, with_timings=True
+        )
+        return self.landmarks
+
+
+class InferenceWorkerPool:
+    """
+    A pool of pose inference worker processes.
+
+    Exposes the same checkout/checkin/release interface as
+    PoseDetectorPool, so the request handlers do not need to know whether
+    inference runs in-process or in workers.
+    """
+
+    def __init__(self, workers=2, slots_per_worker=4, graphs_per_worker=2,
+                 max_frame_shape=DEFAULT_MAX_FRAME_SHAPE, detector_kwargs=None, hang_timeout=60.0):
+        """
+        Start the worker processes.
+
+        Args:
+            workers: Number of worker processes
+            slots_per_worker: Frames that can be in flight per worker
+            graphs_per_worker: PoseDetector graphs per worker (session affinity)
+            max_frame_shape: Largest (height, width, channels) frame a slot holds
+            detector_kwargs: Keyword arguments for each worker's PoseDetectors
+            hang_timeout: Seconds a worker may hold all its slots for
+                timed-out requests before it is restarted
+        """
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+
+        self.size = workers
+        self.max_frame_shape = max_frame_shape
+        self.slot_bytes = int(np.prod(max_frame_shape))
+        self.hang_timeout = hang_timeout
+        self.restarts = 0
+
+        self._pending = {}
+        # request_id -> (worker, slot, monotonic send time) until the worker
+        # answers; slot is None for pings. Requests in here but no longer
+        # pending have timed out.
+        self._in_flight = {}
+        self._pending_lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._ids = itertools.count()
+        # Sessions with a request holding their proxy; see checkout()
+        self._busy_sessions = set()
+        self._sessions_cond = threading.Condition()
+
+        # spawn keeps MediaPipe's native threads out of forked children
+        context = multiprocessing.get_context('spawn')
+        self._workers = [
+            _Worker(context, slots_per_worker, self.slot_bytes,
+                    graphs_per_worker, detector_kwargs or {}, self._dispatch)
+            for _ in range(workers)
+        ]
+        atexit.register(self.close)
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until every worker has built and warmed up its pose graphs.
+
+        Args:
+            timeout: Maximum seconds to wait for all workers
+
+        Raises:
+            TimeoutError: If a worker did not answer in time
+        """
+        futures = [self._submit(worker, 'ping', None, None, None)[1] for worker in self._workers]
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in futures:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            future.result(timeout=remaining)
+
+    def _worker_for(self, session_id):
+        return self._workers[zlib.crc32(session_id.encode('utf-8')) % self.size]
+
+    def _submit(self, worker, kind, session_id, payload, slot):
+        """Queue a request for a worker and register the future for its answer."""
+        request_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+            self._in_flight[request_id] = (worker, slot, time.monotonic())
+        worker.requests.put((kind, request_id, session_id, payload))
+        return request_id, future
+
+    def _restart(self, worker, process, reason):
+        """
+        Replace a worker's process, failing the requests it still held.
+
+        Does nothing if the process was already replaced by another thread.
+        """
+        with self._restart_lock:
+            if worker.process is not process:
+                return
+            if process.is_alive():
+                process.kill()
+            process.join(timeout=5)
+
+            with self._pending_lock:
+                lost = [request_id for request_id, (owner, _, _) in self._in_flight.items()
+                        if owner is worker]
+                futures = [self._pending.pop(request_id, None) for request_id in lost]
+                for request_id in lost:
+                    del self._in_flight[request_id]
+            for future in futures:
+                if future is not None:
+                    future.set_result((None, _RESTARTED))
+
+            worker.start()
+            self.restarts += 1
+            logger.warning('Restarted inference worker', extra={
+                'reason': reason, 'exitcode': process.exitcode, 'lost_requests': len(lost)
+            })
+
+    def _is_hung(self, worker):
+        """True if every slot of the worker is held by a long timed-out request."""
+        stale = time.monotonic() - self.hang_timeout
+        with self._pending_lock:
+            abandoned = sum(
+                1 for request_id, (owner, slot, sent) in self._in_flight.items()
+                if owner is worker and slot is not None and sent <= stale
+                and request_id not in self._pending
+            )
+        return abandoned >= worker.slots
+
+    def _fit(self, image):
+        """Downscale a frame that does not fit in a slot."""
+        max_height, max_width = self.max_frame_shape[:2]
+        height, width = image.shape[:2]
+        if height <= max_height and width <= max_width:
+            return np.ascontiguousarray(image)
+        scale = min(max_height / height, max_width / width)
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    def infer(self, session_id, image, timeout=None, quality=None, with_timings=False):
+        """
+        Run pose inference for a session in its worker process.
+
+        Args:
+            session_id: Session identifier (selects the worker)
+            image: BGR image (numpy array)
+            timeout: Maximum seconds to wait for a slot and the result
+            quality: PoseDetector.configure arguments for this frame
+            with_timings: Also return the worker's PoseDetector.stage_seconds
+
+        Returns:
+            np.ndarray: (33, 4) landmark array, or None if no person found;
+                a (landmarks, stage_seconds) tuple with with_timings
+
+        Raises:
+            TimeoutError: If no slot or result became available in time, or
+                the worker restarted while the frame was in flight
+        """
+        worker = self._worker_for(session_id)
+        process = worker.process
+        if not process.is_alive():
+            self._restart(worker, process, 'exited')
+        image = self._fit(image)
+
+        try:
+            slot = worker.free_slots.get(timeout=timeout)
+        except queue.Empty:
+            if self._is_hung(worker):
+                self._restart(worker, process, 'hung')
+            raise TimeoutError("No inference slot available")
+
+        view = np.ndarray(image.shape, dtype=np.uint8, buffer=worker.shm.buf,
+                          offset=slot * self.slot_bytes)
+        view[...] = image
+        del view
+
+        # From here the slot is returned by _dispatch when the answer
+        # arrives (the worker may read it until then), or by a restart
+        process = worker.process
+        request_id, future = self._submit(
+            worker, 'detect', session_id, (slot, image.shape, quality or {}), slot
+        )
+        try:
+            result, error = future.result(timeout=timeout)
+        except TimeoutError:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            if self._is_hung(worker):
+                self._restart(worker, process, 'hung')
+            raise
+
+        if error == _RESTARTED:
+            raise TimeoutError("Inference worker restarted")
+        if error is not None:
+            raise RuntimeError(f"Inference worker failed: {error}")
+        return result if with_timings else result[0]
+
+    def _dispatch(self, worker, responses):
+        """Route one worker process's answers to the waiting request threads."""
+        while True:
+            try:
+                message = responses.get(timeout=1.0)
+            except queue.Empty:
+                if worker.responses is not responses:
+                    # The process was replaced
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            if message is _STOP:
+                return
+            request_id, result, error = message
+            with self._pending_lock:
+                future = self._pending.pop(request_id, None)
+                owner = self._in_flight.pop(request_id, None)
+            if owner is not None and owner[1] is not None:
+                # The worker is done with the slot, even if the request timed out
+                owner[0].free_slots.put(owner[1])
+            if future is not None:
+                future.set_result((result, error))
+
+    def checkout(self, session_id, timeout=None):
+        """
+        Get a PoseDetector-like proxy bound to the session's worker.
+
+        Like PoseDetectorPool.checkout, blocks while another request of
+        the same session holds it, so a session's frames are sent and
+        answered one request at a time, in order.
+
+        Raises:
+            TimeoutError: If the session stayed busy for timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._sessions_cond:
+            while session_id in self._busy_sessions:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Session is busy")
+                self._sessions_cond.wait(remaining)
+            self._busy_sessions.add(session_id)
+        return RemotePoseDetector(self, session_id, timeout=timeout)
+
+    def checkin(self, session_id):
+        """Let the session's next request through."""
+        with self._sessions_cond:
+            self._busy_sessions.discard(session_id)
+            self._sessions_cond.notify_all()
+
+    def release(self, session_id):
+        """Unpin a session from its worker's pose graph."""
+        self._worker_for(session_id).requests.put(('release', None, session_id, None))
+
+    def stats(self):
+        """Get worker occupancy for debugging."""
+        with self._pending_lock:
+            in_flight = len(self._in_flight)
+        return {
+            'size': self.size,
+            'in_flight': in_flight,
+            'alive': sum(1 for worker in self._workers if worker.process.is_alive()),
+            'restarts': self.restarts
+        }
+
+    def close(self):
+        """Stop the workers and free their shared memory."""
+        if not self._workers:
+            return
+        for worker in self._workers:
+            if worker.process.is_alive():
+                worker.requests.put(_STOP)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            worker.responses.put(_STOP)
+            worker.shm.close()
+            try:
+                worker.shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._workers = []
@@ -0,0 +1,155 @@
+"""
+Joint Angles Module
+Vectorized joint-angle math over many triplets and many frames at once.
+
+Points are laid out as (..., 3, 2) arrays: the last two axes are the
+three points a-b-c of a joint (angle measured at b) and their x, y.
+Any leading axes (joints, frames, sessions) are computed in one pass.
+"""
+
+import numpy as np
+
+from landmark_frame import JOINT_TRIPLETS, LANDMARK_INDEX, MIRROR_INDEX, LandmarkFrame
+
+# Landmark indices of each triplet, and of its mirrored (other side) points
+TRIPLET_INDEX = {
+    name: np.array([LANDMARK_INDEX[point] for point in points], dtype=np.intp)
+    for name, points in JOINT_TRIPLETS.items()
+}
+_MIRROR = np.array(
+    [i if mirror is None else mirror for i, mirror in enumerate(MIRROR_INDEX)],
+    dtype=np.intp
+)
+
+
+def joint_angles(points):
+    """
+    Calculate joint angles in degrees for any number of triplets.
+
+    Same arctan2 formula as calculate_angle, including the wrap to
+    [0, 180].
+
+    Args:
+        points: Array of shape (..., 3, 2) holding points a, b, c
+
+    Returns:
+        np.ndarray: Angles at b with shape points.shape[:-2]
+    """
+    points = np.asarray(points, dtype=np.float64)
+    a = points[..., 0, :]
+    b = points[..., 1, :]
+    c = points[..., 2, :]
+
+    radians = np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) - np.arctan2(
+        a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]
+    )
+    angles = np.abs(np.degrees(radians))
+    return np.where(angles > 180.0, 360.0 - angles, angles)
+
+
+def triplet_indices(names):
+    """Stack the landmark indices of named triplets into a (k, 3) array."""
+    return np.stack([TRIPLET_INDEX[name] for name in names])
+
+
+def gather_triplets(landmarks, names, visibility_threshold=0.5):
+    """
+    Gather the points of named triplets from landmark arrays.
+
+    Each point falls back to its mirrored landmark when not visible,
+    matching PoseDetector.get_landmark.
+
+    Args:
+        landmarks: Array of shape (..., 33, C) whose first two columns are
+            x, y and last column is visibility
+        names: Triplet names from JOINT_TRIPLETS
+        visibility_threshold: Minimum visibility to trust a point
+
+    Returns:
+        tuple: (points of shape (..., k, 3, 2), valid mask of shape (..., k))
+    """
+    index = triplet_indices(names)
+    mirror = _MIRROR[index]
+
+    primary_visible = landmarks[..., index, -1] >= visibility_threshold
+    mirror_visible = landmarks[..., mirror, -1] >= visibility_threshold
+
+    points = np.where(
+        primary_visible[..., None],
+        landmarks[..., index, :2],
+        landmarks[..., mirror, :2]
+    )
+    valid = (primary_visible | mirror_visible).all(axis=-1)
+    return points, valid
+
+
+def compute_joint_angles(landmarks, names, visibility_threshold=0.5):
+    """
+    Calculate named joint angles for one frame or a whole sequence.
+
+    Args:
+        landmarks: (33, C) array for one frame or (frames, 33, C) for many
+        names: Triplet names from JOINT_TRIPLETS
+        visibility_threshold: Minimum visibility to trust a point
+
+    Returns:
+        np.ndarray: Angles of shape (..., k); NaN where a triplet is not visible
+    """
+    points, valid = gather_triplets(landmarks, names, visibility_threshold)
+    return np.where(valid, joint_angles(points), np.nan)
+
+
+class LandmarkSequence:
+    """
+    A run of landmark frames whose joint angles are computed up front.
+
+    All angles for all frames come from one compute_joint_angles call;
+    frame(i) then returns a LandmarkFrame that serves them from that
+    cache, so detectors stepping through a batch never do angle math.
+    """
+
+    def __init__(self, frames, names=tuple(JOINT_TRIPLETS), visibility_threshold=0.5):
+        """
+        Initialize the sequence.
+
+        Args:
+            frames: List of (33, C) landmark arrays, None for frames with no person
+            names: Triplet names to precompute
+            visibility_threshold: Minimum visibility to trust a point
+        """
+        self.frames = frames
+        self.names = tuple(names)
+        self.visibility_threshold = visibility_threshold
+        self._angles = [None] * len(frames)
+
+        present = [i for i, landmarks in enumerate(frames) if landmarks is not None]
+        if present:
+            stacked = np.stack([np.asarray(frames[i])[:, [0, 1, -1]] for i in present])
+            angles = compute_joint_angles(stacked, self.names, visibility_threshold)
+            for i, row in zip(present, angles.tolist()):
+                self._angles[i] = {
+                    name: None if angle != angle else angle
+                    for name, angle in zip(self.names, row)
+                }
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, i):
+        """Get frame i as a LandmarkFrame with precomputed joint angles."""
+        return _SequenceFrame(self.frames[i], self._angles[i], self.visibility_threshold)
+
+
+class _SequenceFrame(LandmarkFrame):
+    """LandmarkFrame that answers joint_angles from a LandmarkSequence cache."""
+
+    def __init__(self, landmarks, angles, visibility_threshold):
+        super().__init__(landmarks)
+        self._angles = angles
+        self._visibility_threshold = visibility_threshold
+
+    def joint_angles(self, names, visibility_threshold=0.5):
+        if (self._angles is None or visibility_threshold != self._visibility_threshold
+                or any(name not in self._angles for name in names)):
+            return super().joint_angles(names, visibility_threshold)
+        return {name: self._angles[name] for name in names}
@@ -0,0 +1,222 @@
+"""
+Landmark Frame Module
+Lightweight pose landmark container with the PoseDetector lookup interface.
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+# MediaPipe Pose landmark names, in landmark index order
+POSE_LANDMARK_NAMES = [
+    'NOSE', 'LEFT_EYE_INNER', 'LEFT_EYE', 'LEFT_EYE_OUTER',
+    'RIGHT_EYE_INNER', 'RIGHT_EYE', 'RIGHT_EYE_OUTER',
+    'LEFT_EAR', 'RIGHT_EAR', 'MOUTH_LEFT', 'MOUTH_RIGHT',
+    'LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_ELBOW', 'RIGHT_ELBOW',
+    'LEFT_WRIST', 'RIGHT_WRIST', 'LEFT_PINKY', 'RIGHT_PINKY',
+    'LEFT_INDEX', 'RIGHT_INDEX', 'LEFT_THUMB', 'RIGHT_THUMB',
+    'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE',
+    'LEFT_ANKLE', 'RIGHT_ANKLE', 'LEFT_HEEL', 'RIGHT_HEEL',
+    'LEFT_FOOT_INDEX', 'RIGHT_FOOT_INDEX'
+]
+NUM_LANDMARKS = len(POSE_LANDMARK_NAMES)
+
+LANDMARK_INDEX = {name: i for i, name in enumerate(POSE_LANDMARK_NAMES)}
+
+# Index of the opposite-side landmark (LEFT_* <-> RIGHT_*), None for the nose
+MIRROR_INDEX = [
+    LANDMARK_INDEX.get(
+        name.replace('LEFT_', 'RIGHT_', 1) if name.startswith('LEFT_')
+        else name.replace('RIGHT_', 'LEFT_', 1) if name.startswith('RIGHT_')
+        else None
+    )
+    for name in POSE_LANDMARK_NAMES
+]
+
+# Named joint triplets (a, b, c) used by the exercise detectors; angle at b
+JOINT_TRIPLETS = {
+    'left_elbow': ('LEFT_SHOULDER', 'LEFT_ELBOW', 'LEFT_WRIST'),
+    'right_elbow': ('RIGHT_SHOULDER', 'RIGHT_ELBOW', 'RIGHT_WRIST'),
+    'left_knee': ('LEFT_HIP', 'LEFT_KNEE', 'LEFT_ANKLE'),
+    'right_knee': ('RIGHT_HIP', 'RIGHT_KNEE', 'RIGHT_ANKLE'),
+    'left_hip': ('LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_KNEE'),
+    'right_hip': ('RIGHT_SHOULDER', 'RIGHT_HIP', 'RIGHT_KNEE'),
+    'left_body_line': ('LEFT_SHOULDER', 'LEFT_HIP', 'LEFT_ANKLE'),
+    'right_body_line': ('RIGHT_SHOULDER', 'RIGHT_HIP', 'RIGHT_ANKLE'),
+}
+
+# Skeleton edges, same as mp.solutions.pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = [
+    (0, 1), (0, 4), (1, 2), (2, 3), (3, 7), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (11, 23), (12, 14), (12, 24), (13, 15), (14, 16),
+    (15, 17), (15, 19), (15, 21), (16, 18), (16, 20), (16, 22), (17, 19),
+    (18, 20), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29),
+    (27, 31), (28, 30), (28, 32), (29, 31), (30, 32)
+]
+_CONNECTIONS = np.array(POSE_CONNECTIONS, dtype=np.intp)
+
+
+def calculate_angle(a, b, c):
+    """Calculate the angle at point b (in degrees) formed by points a-b-c.
+
+    Uses arctan2 method matching the working reference implementation.
+    """
+    radians = math.atan2(c[1] - b[1], c[0] - b[0]) - math.atan2(
+        a[1] - b[1], a[0] - b[0]
+    )
+    angle = abs(math.degrees(radians))
+
+    if angle > 180.0:
+        angle = 360 - angle
+
+    return angle
+
+
+def landmarks_to_array(landmarks):
+    """Convert MediaPipe landmarks to a (33, 4) float32 array of x, y, z, visibility."""
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks],
+        dtype=np.float32
+    )
+
+
+def draw_landmarks(image, landmarks, visibility_threshold=0.5):
+    """
+    Draw a landmark array on an image in the MediaPipe demo style.
+
+    All bones go out in one cv2.polylines call and all joints in another,
+    instead of one OpenCV call per line and circle.
+
+    Args:
+        image: BGR image to draw on (modified in place)
+        landmarks: (33, 3) or (33, 4) array; first two columns are
+            normalized x, y and the last is visibility
+
+    Returns:
+        image: Image with landmarks drawn
+    """
+    if landmarks is None:
+        return image
+
+    height, width = image.shape[:2]
+    points = np.rint(landmarks[:, :2] * (width, height)).astype(np.int32)
+    visible = landmarks[:, -1] >= visibility_threshold
+
+    # Connections (bones): bright magenta/pink lines, one 2-point polyline each
+    bones = _CONNECTIONS[visible[_CONNECTIONS].all(axis=1)]
+    if len(bones):
+        cv2.polylines(image, points[bones], False, (255, 0, 255), 3)
+    # Landmarks (joints): bright green dots; a closed 1-point polyline
+    # is drawn as a round dot of the line thickness
+    joints = points[visible][:, None, :]
+    if len(joints):
+        cv2.polylines(image, joints, True, (0, 255, 0), 13)
+    return image
+
+
+def parse_landmarks(values):
+    """
+    Convert client-supplied landmarks to a (33, 3) float32 array.
+
+    Args:
+        values: 33 [x, y, visibility] triples or a flat list of 99 numbers,
+            normalized to the image size like MediaPipe output
+
+    Returns:
+        np.ndarray of shape (33, 3), or None if values is None
+
+    Raises:
+        ValueError: If the values cannot be shaped into 33 landmarks or
+            are not all finite (JSON NaN and Infinity are rejected)
+    """
+    if values is None:
+        return None
+    array = np.asarray(values, dtype=np.float32)
+    if array.size != NUM_LANDMARKS * 3:
+        raise ValueError(f'Expected {NUM_LANDMARKS} landmarks of [x, y, visibility]')
+    if not np.isfinite(array).all():
+        raise ValueError('Landmark values must be finite numbers')
+    return array.reshape(NUM_LANDMARKS, 3)
+
+
+class LandmarkFrame:
+    """
+    One frame of pose landmarks with the lookups exercise detectors use.
+
+    Exercise detectors only call get_landmark, calculate_angle and
+    landmarks_detected. PoseDetector extends this class with MediaPipe
+    inference; on its own it lets client-computed landmarks drive the
+    detectors without running pose inference on the server.
+    """
+
+    def __init__(self, landmarks=None):
+        """
+        Initialize the frame.
+
+        Args:
+            landmarks: (33, 3) array of x, y, visibility or (33, 4) array of
+                x, y, z, visibility; None if no person
+        """
+        self.landmarks = landmarks
+
+    def _get(self, index, visibility_threshold):
+        row = self.landmarks[index]
+        if row[-1] < visibility_threshold:
+            return None
+        return (float(row[0]), float(row[1]))
+
+    def get_landmark(self, landmark_name, visibility_threshold=0.5):
+        """
+        Get a specific landmark position with visibility check and left/right fallback.
+
+        Args:
+            landmark_name: The name of the landmark (e.g., 'LEFT_SHOULDER')
+            visibility_threshold: Minimum visibility required to trust the point
+
+        Returns:
+            tuple: (x, y) coordinates or None if not found/visible
+        """
+        if self.landmarks is None:
+            return None
+
+        index = LANDMARK_INDEX.get(landmark_name)
+        if index is None:
+            return None
+
+        point = self._get(index, visibility_threshold)
+        if point is not None:
+            return point
+
+        # Fallback to opposite side if available (helps when camera mirrors)
+        mirror = MIRROR_INDEX[index]
+        if mirror is None:
+            return None
+        return self._get(mirror, visibility_threshold)
+
+    calculate_angle = staticmethod(calculate_angle)
+
+    def joint_angles(self, names, visibility_threshold=0.5):
+        """
+        Calculate named joint angles (see JOINT_TRIPLETS) for this frame.
+
+        A single frame only needs a couple of angles, where scalar math
+        beats NumPy's per-call overhead; LandmarkSequence computes whole
+        batches with the vectorized kernel instead.
+
+        Returns:
+            dict: Angle in degrees per name, None if a point is not visible
+        """
+        angles = {}
+        for name in names:
+            points = [self.get_landmark(point, visibility_threshold) for point in JOINT_TRIPLETS[name]]
+            angles[name] = None if None in points else calculate_angle(*points)
+        return angles
+
+    def draw_landmarks(self, image, results=None):
+        """Draw this frame's landmarks on the image (results is ignored)."""
+        return draw_landmarks(image, self.landmarks)
+
+    def landmarks_detected(self):
+        """Check if this frame has landmarks."""
+        return self.landmarks is not None
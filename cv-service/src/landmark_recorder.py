@@ -0,0 +1,398 @@
+"""
+Landmark Recorder Module
+Append-only, quantized recordings of the landmarks each session's detector saw.
+
+Every frame fed to an exercise detector can be recorded with its
+timestamp, count and counter zone, so sessions can be re-scored after
+thresholds change. Request threads only put frames on a queue; a
+background thread buffers them per session and exercise and appends
+them to disk a block at a time.
+
+Each (session, exercise) pair gets a data file and an index file:
+
+    <stem>.flr   32-byte header, then blocks of up to block_frames frames
+    <stem>.flri  One INDEX_DTYPE record per block: offset, frames, time range
+
+A block is columnar: a 16-byte block header followed by the BLOCK_COLUMNS
+arrays, each starting on an 8-byte boundary. Coordinates are int16 in
+units of 1/COORD_SCALE and visibility is uint8 in units of 1/255, about
+a quarter of the float32 size. Blocks can be memory-mapped in place, and
+the index finds the blocks of any time range without scanning the data.
+"""
+
+import atexit
+import fcntl
+import hashlib
+import logging
+import os
+import queue
+import re
+import struct
+import threading
+import time
+
+import numpy as np
+
+from landmark_frame import NUM_LANDMARKS
+from rep_counter import ZONE_CODES
+
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b'FLRC'
+BLOCK_MAGIC = b'FLRB'
+FORMAT_VERSION = 1
+
+# Normalized coordinates are stored as round(value * COORD_SCALE) in int16,
+# so values within +-3.27 keep a resolution of 1e-4
+COORD_SCALE = 10000.0
+
+# magic, version, landmarks, coordinate scale, exercise type
+_FILE_HEADER = struct.Struct('<4sHHf20s')
+# magic, frames, reserved
+_BLOCK_HEADER = struct.Struct('<4sII4x')
+
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('frames', '<u4'),
+    ('t_start', '<f8'),
+    ('t_end', '<f8'),
+])
+
+# Column name, dtype and per-frame shape, in on-disk order
+BLOCK_COLUMNS = (
+    ('t', '<f8', ()),
+    ('count', '<i4', ()),
+    ('zone', 'i1', ()),
+    ('present', 'u1', ()),
+    ('xyz', '<i2', (NUM_LANDMARKS, 3)),
+    ('visibility', 'u1', (NUM_LANDMARKS,)),
+)
+
+_SAFE_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def block_layout(frames):
+    """
+    Byte offsets of each column in a block of the given size.
+
+    Returns:
+        tuple: ([(name, dtype, shape, offset), ...], total block size in bytes)
+    """
+    layout = []
+    offset = _BLOCK_HEADER.size
+    for name, dtype, shape in BLOCK_COLUMNS:
+        dtype = np.dtype(dtype)
+        layout.append((name, dtype, (frames,) + shape, offset))
+        offset = _align(offset + dtype.itemsize * frames * int(np.prod(shape, dtype=np.int64)))
+    return layout, offset
+
+
+def recording_stem(session_id, exercise_type):
+    """File name stem of a session's recording; unsafe session ids are hashed."""
+    if not _SAFE_SESSION_ID.match(session_id):
+        session_id = hashlib.sha1(session_id.encode('utf-8')).hexdigest()
+    return f'{session_id}.{exercise_type}'
+
+
+def encode_block(frames):
+    """
+    Pack buffered frames into one block.
+
+    Args:
+        frames: List of (timestamp, landmarks or None, count, zone) tuples
+
+    Returns:
+        bytearray: Block header and columns
+    """
+    n = len(frames)
+    layout, size = block_layout(n)
+    block = bytearray(size)
+    _BLOCK_HEADER.pack_into(block, 0, BLOCK_MAGIC, n, 0)
+    columns = {
+        name: np.ndarray(shape, dtype=dtype, buffer=block, offset=offset)
+        for name, dtype, shape, offset in layout
+    }
+
+    for i, (timestamp, landmarks, count, zone) in enumerate(frames):
+        columns['t'][i] = timestamp
+        columns['count'][i] = count
+        columns['zone'][i] = ZONE_CODES.get(zone, 0)
+        if landmarks is None:
+            continue
+        columns['present'][i] = 1
+        landmarks = np.asarray(landmarks, dtype=np.float32)
+        # (33, 3) client landmarks have no z
+        coords = landmarks[:, :3] if landmarks.shape[1] >= 4 else landmarks[:, :2]
+        columns['xyz'][i, :, :coords.shape[1]] = np.clip(
+            np.rint(coords * COORD_SCALE), -32767, 32767
+        )
+        columns['visibility'][i] = np.clip(np.rint(landmarks[:, -1] * 255), 0, 255)
+    return block
+
+
+class LandmarkRecorder:
+    """
+    Records detector frames to per-session files from a background thread.
+
+    record() never blocks: frames arriving while the queue is full are
+    dropped and counted. A session's buffered frames are written once
+    block_frames have gathered, flush_interval seconds after the first of
+    them, or when the session is released.
+    """
+
+    def __init__(self, directory, block_frames=256, flush_interval=5.0, queue_size=10000):
+        """
+        Initialize the recorder and start its writer thread.
+
+        Args:
+            directory: Directory for the recording files (created if needed)
+            block_frames: Frames per block
+            flush_interval: Seconds a frame may wait in the buffer
+            queue_size: Frames queued for the writer before new ones are dropped
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.block_frames = block_frames
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        # (session_id, exercise_type) -> [monotonic time of first frame, frames]
+        self._buffers = {}
+        self.frames_recorded = 0
+        self.frames_dropped = 0
+        self.blocks_written = 0
+        self.bytes_written = 0
+        self._thread = None
+        self.start()
+        atexit.register(self.stop)
+
+    def start(self):
+        """Start the writer thread, e.g. again in a forked child process."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='landmark-recorder', daemon=True)
+            self._thread.start()
+
+    def record(self, session_id, exercise_type, timestamp, landmarks, count, zone):
+        """
+        Queue one frame for recording.
+
+        Args:
+            session_id: Session identifier
+            exercise_type: Exercise the frame was counted for
+            timestamp: Frame time in seconds
+            landmarks: (33, 3|4) array the detector saw (not copied, so
+                must not be modified afterwards), or None if no person
+            count: Detector count after the frame
+            zone: Rep counter zone after the frame (None, 'high' or 'low')
+        """
+        try:
+            self._queue.put_nowait((session_id, exercise_type, timestamp, landmarks, count, zone))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def release(self, session_id):
+        """Write out a session's buffered frames."""
+        try:
+            self._queue.put_nowait(session_id)
+        except queue.Full:
+            # The periodic flush still writes them within flush_interval
+            pass
+
+    def stop(self):
+        """Write out every buffered frame and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self):
+        """Get frame, block and byte totals of this process."""
+        return {
+            'directory': self.directory,
+            'frames_recorded': self.frames_recorded,
+            'frames_dropped': self.frames_dropped,
+            'frames_queued': self._queue.qsize(),
+            'blocks_written': self.blocks_written,
+            'bytes_written': self.bytes_written
+        }
+
+    def _run(self):
+        next_sweep = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval / 4)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                self._flush(list(self._buffers))
+                return
+            if isinstance(item, str):
+                self._flush([key for key in self._buffers if key[0] == item])
+            elif item:
+                session_id, exercise_type, timestamp, landmarks, count, zone = item
+                buffer = self._buffers.setdefault((session_id, exercise_type), [time.monotonic(), []])
+                buffer[1].append((timestamp, landmarks, count, zone))
+                if len(buffer[1]) >= self.block_frames:
+                    self._flush([(session_id, exercise_type)])
+
+            now = time.monotonic()
+            if now >= next_sweep:
+                # Sweep for stale buffers a few times per flush interval,
+                # not on every frame
+                next_sweep = now + self.flush_interval / 4
+                deadline = now - self.flush_interval
+                self._flush([key for key, (began, _) in self._buffers.items() if began <= deadline])
+
+    def _flush(self, keys):
+        for key in keys:
+            _, frames = self._buffers.pop(key)
+            try:
+                self._write(key, frames)
+            except Exception:
+                logger.exception('Writing landmark recording failed',
+                                 extra={'session_id': key[0], 'frames': len(frames)})
+
+    def _write(self, key, frames):
+        session_id, exercise_type = key
+        stem = os.path.join(self.directory, recording_stem(session_id, exercise_type))
+        block = encode_block(frames)
+        index = np.array(
+            [(0, len(frames), frames[0][0], frames[-1][0])], dtype=INDEX_DTYPE
+        )
+
+        with open(stem + '.flr', 'ab') as data, open(stem + '.flri', 'ab') as index_file:
+            # Workers of other processes may append to the same session
+            fcntl.flock(data, fcntl.LOCK_EX)
+            try:
+                offset = os.fstat(data.fileno()).st_size
+                if offset == 0:
+                    header = _FILE_HEADER.pack(
+                        FILE_MAGIC, FORMAT_VERSION, NUM_LANDMARKS, COORD_SCALE,
+                        exercise_type.encode('utf-8')
+                    )
+                    data.write(header)
+                    offset = len(header)
+                data.write(block)
+                data.flush()
+                index['offset'] = offset
+                index_file.write(index.tobytes())
+                index_file.flush()
+            finally:
+                fcntl.flock(data, fcntl.LOCK_UN)
+
+        self.frames_recorded += len(frames)
+        self.blocks_written += 1
+        self.bytes_written += len(block) + index.nbytes
+
+
+class Recording:
+    """
+    Read-only, memory-mapped view of one recording.
+
+    Columns come back as views of the mapped file wherever possible, so
+    reading a time range only touches the blocks of that range.
+    """
+
+    def __init__(self, path):
+        """
+        Open a recording.
+
+        Args:
+            path: The .flr data file; its .flri index must sit next to it
+
+        Raises:
+            ValueError: If the file is not a landmark recording
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError(f'{path}: not a landmark recording')
+        magic, version, landmarks, scale, exercise_type = _FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path}: not a landmark recording (version {FORMAT_VERSION})')
+        self.num_landmarks = landmarks
+        self.coord_scale = scale
+        self.exercise_type = exercise_type.rstrip(b'\0').decode('utf-8')
+
+        index_path = os.path.splitext(path)[0] + '.flri'
+        self.index = np.fromfile(index_path, dtype=INDEX_DTYPE) if os.path.exists(index_path) \
+            else np.zeros(0, dtype=INDEX_DTYPE)
+        self._data = np.memmap(path, dtype=np.uint8, mode='r') if len(self.index) else None
+
+    def __len__(self):
+        return int(self.index['frames'].sum())
+
+    def blocks(self, start=None, end=None):
+        """
+        Iterate over the blocks overlapping a time range.
+
+        Args:
+            start: First time (seconds) of interest, None for the beginning
+            end: Last time (seconds) of interest, None for the end
+
+        Yields:
+            dict: Column name -> memory-mapped array (see BLOCK_COLUMNS)
+        """
+        selected = np.ones(len(self.index), dtype=bool)
+        if start is not None:
+            selected &= self.index['t_end'] >= start
+        if end is not None:
+            selected &= self.index['t_start'] <= end
+
+        for offset, frames in self.index[selected][['offset', 'frames']].tolist():
+            layout, _ = block_layout(frames)
+            yield {
+                name: np.ndarray(shape, dtype=dtype, buffer=self._data, offset=offset + column)
+                for name, dtype, shape, column in layout
+            }
+
+    def read(self, start=None, end=None):
+        """
+        Read the frames within a time range, dequantized.
+
+        Args:
+            start: First time (seconds) to include, None for the beginning
+            end: Last time (seconds) to include, None for the end
+
+        Returns:
+            dict: 't' (n,) float64 seconds, 'landmarks' (n, 33, 4) float32
+                x, y, z, visibility (all zero where no person), 'present'
+                (n,) bool, 'count' (n,) int32 and 'zone' (n,) int8 codes
+                (see ZONE_CODES)
+        """
+        blocks = list(self.blocks(start, end))
+        if not blocks:
+            return {
+                't': np.zeros(0), 'landmarks': np.zeros((0, self.num_landmarks, 4), np.float32),
+                'present': np.zeros(0, bool), 'count': np.zeros(0, np.int32),
+                'zone': np.zeros(0, np.int8)
+            }
+        columns = {name: np.concatenate([block[name] for block in blocks]) for name, _, _ in BLOCK_COLUMNS}
+
+        keep = np.ones(len(columns['t']), dtype=bool)
+        if start is not None:
+            keep &= columns['t'] >= start
+        if end is not None:
+            keep &= columns['t'] <= end
+
+        landmarks = np.empty((int(keep.sum()), self.num_landmarks, 4), dtype=np.float32)
+        landmarks[..., :3] = columns['xyz'][keep] / np.float32(self.coord_scale)
+        landmarks[..., 3] = columns['visibility'][keep] / np.float32(255)
+        return {
+            't': columns['t'][keep],
+            'landmarks': landmarks,
+            'present': columns['present'][keep].astype(bool),
+            'count': columns['count'][keep],
+            'zone': columns['zone'][keep]
+        }
+
+
+def find_recordings(directory):
+    """List the .flr recording files in a directory, sorted by name."""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.flr')
+    )
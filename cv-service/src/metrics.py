@@ -0,0 +1,139 @@
+"""
+Metrics Module
+Prometheus metrics and per-request stage timing for the detect pipeline.
+
+A StageTimer follows one request through body parsing, decoding,
+inference, counting, annotation and serialization. Its timings feed the
+stage histograms exported on /metrics and the request's Server-Timing
+header, so server-side stages can be lined up with client latency.
+
+When gunicorn runs several workers, set PROMETHEUS_MULTIPROC_DIR to a
+shared, empty directory and /metrics aggregates across them.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Stages of /api/detect, in pipeline order
+STAGES = (
+    'parse',         # request body / options
+    'base64',        # base64 payload decode
+    'imdecode',      # JPEG/WebP/PNG decode
+    'pool_wait',     # waiting for the session's pose graph
+    'cvtcolor',      # crop, resize and BGR->RGB conversion
+    'pose_process',  # MediaPipe inference
+    'detector',      # exercise state machine and session store
+    'annotate',      # drawing the overlay
+    'encode',        # JPEG encode or landmark serialization
+    'serialize',     # JSON response body
+)
+
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+STAGE_SECONDS = Histogram(
+    'fitform_detect_stage_seconds',
+    'Time spent in each stage of frame detection',
+    ['stage'],
+    buckets=_STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'fitform_detect_request_seconds',
+    'Total time to handle a detect request',
+    buckets=_STAGE_BUCKETS
+)
+FRAMES = Counter(
+    'fitform_frames_total',
+    'Frames handled, by outcome (processed, skipped by the motion gate, invalid, rate_limited)',
+    ['outcome']
+)
+DETECTION_MISSES = Counter(
+    'fitform_detection_misses_total',
+    'Processed frames in which no person was detected'
+)
+REPS = Counter(
+    'fitform_reps_total',
+    'Reps counted',
+    ['exercise_type']
+)
+ACTIVE_SESSIONS = Gauge(
+    'fitform_active_sessions',
+    'Sessions currently held by the session store',
+    multiprocess_mode='max'
+)
+
+
+class StageTimer:
+    """Accumulates stage durations for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as a stage (repeats add up)."""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - began)
+
+    def add(self, name, seconds):
+        """Add seconds to a stage."""
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def add_all(self, seconds):
+        """Add a {stage: seconds} mapping, e.g. a PoseDetector's stage_seconds."""
+        for name, value in seconds.items():
+            self.add(name, value)
+
+    def observe(self):
+        """Record the stages and the total in the Prometheus histograms."""
+        for name, value in self.seconds.items():
+            STAGE_SECONDS.labels(name).observe(value)
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started)
+
+    def server_timing(self):
+        """Format the stages as a Server-Timing header value (milliseconds)."""
+        entries = [
+            f'{name};dur={self.seconds[name] * 1000:.2f}'
+            for name in STAGES if name in self.seconds
+        ]
+        entries.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(entries)
+
+
+class _NullTimer:
+    """Stand-in when a caller does not time its stages."""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def add(self, name, seconds):
+        pass
+
+    def add_all(self, seconds):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,188 @@
+"""
+Motion Gate Module
+Skips pose inference for frames that match the session's last processed frame.
+
+At 10 FPS many consecutive frames barely differ: holds, a stalled webcam
+returning the same screenshot, or client retries resending the same
+payload. Each frame is compared with the session's last processed frame,
+first by a hash of the encoded bytes and then by the mean difference of
+a tiny grayscale thumbnail. Matches reuse the previous landmarks and
+detector state instead of running MediaPipe again.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Thumbnail (width, height) compared between frames
+THUMBNAIL_SIZE = (32, 24)
+
+
+class _Entry:
+    """Last processed frame and skip counters of one session."""
+
+    __slots__ = ('exercise_type', 'digest', 'thumbnail', 'landmarks', 'state',
+                 'consecutive_skips', 'frames', 'duplicates', 'still')
+
+    def __init__(self):
+        self.exercise_type = None
+        self.digest = None
+        self.thumbnail = None
+        self.landmarks = None
+        self.state = None
+        self.consecutive_skips = 0
+        self.frames = 0
+        self.duplicates = 0
+        self.still = 0
+
+    def skip_ratio(self):
+        return round((self.duplicates + self.still) / self.frames, 4) if self.frames else 0.0
+
+
+def content_digest(payload):
+    """Hash an encoded frame (bytes or base64 text)."""
+    if isinstance(payload, str):
+        payload = payload.encode('ascii', 'ignore')
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def thumbnail(image):
+    """Shrink a BGR image to a THUMBNAIL_SIZE grayscale thumbnail."""
+    small = cv2.resize(image, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+class MotionGate:
+    """
+    Per-session gate in front of pose inference.
+
+    check() decides whether a frame can reuse the last result; record()
+    stores the result of a frame that was processed. Entries are kept
+    for at most max_sessions sessions, least recently used first out,
+    and should be released with the session.
+    """
+
+    def __init__(self, threshold=2.0, max_consecutive_skips=30, max_sessions=10000):
+        """
+        Initialize the gate.
+
+        Args:
+            threshold: Mean absolute thumbnail difference (0-255) below
+                which a frame counts as unchanged
+            max_consecutive_skips: Frames reused in a row before one is
+                processed anyway, so tracking never goes stale
+            max_sessions: Sessions to keep gate state for
+        """
+        self.threshold = threshold
+        self.max_consecutive_skips = max_consecutive_skips
+        self.max_sessions = max_sessions
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Lifetime totals, kept when sessions are released
+        self._totals = {'frames': 0, 'duplicate': 0, 'still': 0}
+
+    def _entry(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = self._entries[session_id] = _Entry()
+                while len(self._entries) > self.max_sessions:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(session_id)
+            return entry
+
+    def check(self, session_id, exercise_type, image, payload=None):
+        """
+        Check a frame against the session's last processed frame.
+
+        Args:
+            session_id: Session identifier
+            exercise_type: Exercise the frame is counted for
+            image: Decoded BGR image
+            payload: Encoded frame the image came from, if available
+
+        Returns:
+            tuple: (reason, landmarks, state, digest, thumbnail). reason is
+                'duplicate' or 'still' when the frame can be skipped, in
+                which case landmarks and state are the reusable results;
+                otherwise reason is None. digest and thumbnail go to record().
+        """
+        entry = self._entry(session_id)
+        entry.frames += 1
+
+        digest = content_digest(payload) if payload is not None else None
+        reusable = (
+            entry.state is not None
+            and entry.exercise_type == exercise_type
+            and entry.consecutive_skips < self.max_consecutive_skips
+        )
+
+        reason = None
+        if reusable and digest is not None and digest == entry.digest:
+            # Same bytes, same pixels: no need for the thumbnail either
+            reason = 'duplicate'
+            entry.duplicates += 1
+            small = entry.thumbnail
+        else:
+            small = thumbnail(image)
+            if reusable and np.abs(small.astype(np.int16) - entry.thumbnail).mean() < self.threshold:
+                reason = 'still'
+                entry.still += 1
+
+        with self._lock:
+            self._totals['frames'] += 1
+            if reason is not None:
+                self._totals[reason] += 1
+
+        if reason is None:
+            return None, None, None, digest, small
+        entry.consecutive_skips += 1
+        return reason, entry.landmarks, dict(entry.state), digest, small
+
+    def record(self, session_id, exercise_type, digest, small, landmarks, state):
+        """Store the results of a processed frame for later reuse."""
+        entry = self._entry(session_id)
+        entry.exercise_type = exercise_type
+        entry.digest = digest
+        entry.thumbnail = small
+        entry.landmarks = landmarks
+        entry.state = dict(state)
+        entry.consecutive_skips = 0
+
+    def skip_ratio(self, session_id):
+        """Fraction of the session's frames that were skipped."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        return entry.skip_ratio() if entry else 0.0
+
+    def forget(self, session_id):
+        """Drop the reusable result (after a counter reset) but keep the counters."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is not None:
+            entry.state = None
+            entry.landmarks = None
+
+    def release(self, session_id):
+        """Drop all gate state of a session."""
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self):
+        """Get lifetime skip counters across all sessions."""
+        with self._lock:
+            sessions = len(self._entries)
+            totals = dict(self._totals)
+        frames = totals['frames']
+        skipped = totals['duplicate'] + totals['still']
+        return {
+            'sessions': sessions,
+            'frames': frames,
+            'skipped_duplicate': totals['duplicate'],
+            'skipped_still': totals['still'],
+            'skip_ratio': round(skipped / frames, 4) if frames else 0.0
+        }
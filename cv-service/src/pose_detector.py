@@ -3,7 +3,9 @@ Pose Detector Module
 Uses MediaPipe for human pose detection and landmark extraction.
 """
 
+import logging
 import os
+import time
 
 # Disable GPU for MediaPipe - must be set before importing mediapipe
 os.environ["MEDIAPIPE_DISABLE_GPU"] = "1"
@@ -12,34 +14,109 @@ os.environ["GLOG_minloglevel"] = "2"
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
 
 import mediapipe as mp
-import numpy as np
 import cv2
+import numpy as np
+
+from landmark_frame import LandmarkFrame, landmarks_to_array
+
+logger = logging.getLogger(__name__)
 
+# Smallest crop box side (fraction of the frame) worth tracking in; a
+# smaller box means the landmarks left the frame
+MIN_ROI_SIZE = 0.05
 
-class PoseDetector:
+
+class PoseDetector(LandmarkFrame):
     """
     A wrapper class for MediaPipe Pose detection.
     Provides methods for detecting pose landmarks and calculating angles.
+
+    Each frame's landmarks are converted once into a (33, 4) float32 array
+    of x, y, z, visibility; lookups, angles and drawing all read from it.
+
+    Frames are shrunk before inference: once a person is tracked only a
+    padded box around the previous landmarks is processed, and whatever
+    is processed is downscaled to max_input_size. Landmarks are always
+    returned in full-frame normalized coordinates.
+
+    configure() switches model complexity and input size between frames;
+    a graph per complexity is built on first use and kept.
     """
     
-    def __init__(self, min_detection_confidence=0.3, min_tracking_confidence=0.3):
+    def __init__(self, min_detection_confidence=0.3, min_tracking_confidence=0.3,
+                 max_input_size=640, roi_padding=0.25, use_roi=True, model_complexity=1):
         """
         Initialize the PoseDetector.
         
         Args:
             min_detection_confidence: Minimum confidence for detection (0.0-1.0)
             min_tracking_confidence: Minimum confidence for tracking (0.0-1.0)
+            max_input_size: Longest side in pixels passed to MediaPipe (0 = no limit)
+            roi_padding: Padding around the tracked person, as a fraction of its box
+            use_roi: Crop to the tracked person instead of processing the full frame
+            model_complexity: MediaPipe model to start with (0 = lite, 1 = full)
         """
+        super().__init__()
+        self.default_input_size = max_input_size
+        self.max_input_size = max_input_size
+        self.roi_padding = roi_padding
+        self.use_roi = use_roi
+        # Crop box (x0, y0, x1, y1) in normalized full-frame coordinates
+        self.roi = None
+        # Reusable resize/RGB buffers; the graph is pinned to one session,
+        # so frames keep the same size and steady state allocates nothing
+        self._buffers = {}
+        # Seconds spent preparing the input and in MediaPipe on the last frame
+        self.stage_seconds = {}
         self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=min_detection_confidence,
-            min_tracking_confidence=min_tracking_confidence
-        )
-        self.landmarks = None
+        self._confidences = (min_detection_confidence, min_tracking_confidence)
+        self._graphs = {}
+        # Complexities whose graph could not be built (e.g. model download failed)
+        self._unavailable = set()
+        self.model_complexity = model_complexity
+        self.pose = self._graph(model_complexity)
+
+    def _graph(self, model_complexity):
+        """Get the MediaPipe graph for a model complexity, building it on first use."""
+        graph = self._graphs.get(model_complexity)
+        if graph is None:
+            min_detection_confidence, min_tracking_confidence = self._confidences
+            graph = self._graphs[model_complexity] = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=model_complexity,
+                enable_segmentation=False,
+                min_detection_confidence=min_detection_confidence,
+                min_tracking_confidence=min_tracking_confidence
+            )
+        return graph
+
+    def configure(self, model_complexity=None, max_input_size=None):
+        """
+        Choose the model and input size for the following frames.
+
+        Args:
+            model_complexity: MediaPipe model (0 = lite, 1 = full); None keeps the current one
+            max_input_size: Longest input side; None restores the configured default
+        """
+        self.max_input_size = self.default_input_size if max_input_size is None else max_input_size
+        if (model_complexity is None or model_complexity == self.model_complexity
+                or model_complexity in self._unavailable):
+            return
+
+        try:
+            graph = self._graph(model_complexity)
+        except Exception as e:
+            # MediaPipe downloads the lite/heavy models on first use; without
+            # them keep running the current graph rather than failing frames
+            logger.warning('Pose model complexity %s unavailable: %s', model_complexity, e)
+            self._unavailable.add(model_complexity)
+            return
+
+        # The other graph's tracking state is stale; start it fresh
+        self.model_complexity = model_complexity
+        self.pose = graph
+        self.pose.reset()
+        self.roi = None
         
     def detect(self, image):
         """
@@ -49,104 +126,129 @@ class PoseDetector:
             image: BGR image (numpy array)
             
         Returns:
-            results: MediaPipe pose detection results
+            np.ndarray: (33, 4) landmark array, or None if no person found
         """
+        height, width = image.shape[:2]
+        landmarks = None
+        self.stage_seconds = {'cvtcolor': 0.0, 'pose_process': 0.0}
+
+        if self.roi is not None:
+            landmarks = self._process(image, self.roi)
+            if landmarks is None:
+                # Tracking lost: drop the crop and re-detect on the full frame
+                self.roi = None
+                self.pose.reset()
+
+        if landmarks is None:
+            landmarks = self._process(image, None)
+
+        self.landmarks = landmarks
+        if landmarks is not None and self.use_roi:
+            self._update_roi(landmarks, width / height)
+        return self.landmarks
+
+    def _process(self, image, roi):
+        """Run MediaPipe on a crop of the image and map landmarks back to the full frame."""
+        height, width = image.shape[:2]
+        if roi is not None:
+            x0, y0 = int(roi[0] * width), int(roi[1] * height)
+            x1, y1 = int(np.ceil(roi[2] * width)), int(np.ceil(roi[3] * height))
+            if x1 <= x0 or y1 <= y0:
+                # Empty crop; fall back to the full frame
+                roi = None
+            else:
+                image = image[y0:y1, x0:x1]
+        if roi is None:
+            x0, y0, x1, y1 = 0, 0, width, height
+
+        began = time.perf_counter()
+        crop_height, crop_width = image.shape[:2]
+        longest = max(crop_height, crop_width)
+        if self.max_input_size and longest > self.max_input_size:
+            # Normalized landmarks are unaffected by a uniform rescale
+            scale = self.max_input_size / longest
+            size = (max(1, round(crop_width * scale)), max(1, round(crop_height * scale)))
+            resized = self._buffer('resized', (size[1], size[0], 3))
+            image = cv2.resize(image, size, dst=resized, interpolation=cv2.INTER_AREA)
+
         # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image_rgb.flags.writeable = False
-        
-        # Process the image
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._buffer('rgb', image.shape))
+
+        converted = time.perf_counter()
+        self.stage_seconds['cvtcolor'] += converted - began
+
+        # Process the image; keep only the landmark array, not the protobuf
         results = self.pose.process(image_rgb)
-        
-        if results.pose_landmarks:
-            self.landmarks = results.pose_landmarks.landmark
-        else:
-            self.landmarks = None
-            
-        return results
-    
-    def get_landmark(self, landmark_name, visibility_threshold=0.5):
+        self.stage_seconds['pose_process'] += time.perf_counter() - converted
+        if not results.pose_landmarks:
+            return None
+
+        landmarks = landmarks_to_array(results.pose_landmarks.landmark)
+        if roi is not None:
+            landmarks[:, 0] = (landmarks[:, 0] * crop_width + x0) / width
+            landmarks[:, 1] = (landmarks[:, 1] * crop_height + y0) / height
+            landmarks[:, 2] *= crop_width / width
+        return landmarks
+
+    def _buffer(self, name, shape):
+        """Get a reusable uint8 buffer, reallocating only when the shape changes."""
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def _update_roi(self, landmarks, aspect):
         """
-        Get a specific landmark position with visibility check and left/right fallback.
+        Move the crop box to follow the tracked person.
 
-        Args:
-            landmark_name: The name of the landmark (e.g., 'LEFT_SHOULDER')
-            visibility_threshold: Minimum visibility required to trust the point
-            
-        Returns:
-            tuple: (x, y) coordinates or None if not found/visible
+        The box is kept while the person stays well inside it, because
+        MediaPipe tracks in crop coordinates: every move costs a fresh
+        detection, so the graph is reset whenever the box changes.
         """
-        if self.landmarks is None:
-            return None
+        visible = landmarks[landmarks[:, 3] >= 0.5]
+        if len(visible) < 4:
+            if self.roi is not None:
+                self.roi = None
+                self.pose.reset()
+            return
 
-        def _get(name):
-            try:
-                enum_val = getattr(self.mp_pose.PoseLandmark, name)
-                lm = self.landmarks[enum_val.value]
-                if lm.visibility < visibility_threshold:
-                    return None
-                return (lm.x, lm.y)
-            except (AttributeError, IndexError):
-                return None
-
-        # Try requested side first
-        point = _get(landmark_name)
-        if point is not None:
-            return point
-
-        # Fallback to opposite side if available (helps when camera mirrors)
-        if landmark_name.startswith('LEFT_'):
-            alt_name = landmark_name.replace('LEFT_', 'RIGHT_', 1)
-            return _get(alt_name)
-        if landmark_name.startswith('RIGHT_'):
-            alt_name = landmark_name.replace('RIGHT_', 'LEFT_', 1)
-            return _get(alt_name)
-        return None
-    
-    @staticmethod
-    def calculate_angle(a, b, c):
-        """Calculate the angle at point b (in degrees) formed by points a-b-c.
+        x_min, y_min = visible[:, :2].min(axis=0)
+        x_max, y_max = visible[:, :2].max(axis=0)
 
-        Uses arctan2 method matching the working reference implementation.
-        """
-        a = np.array(a)
-        b = np.array(b)
-        c = np.array(c)
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            margin_x = (x1 - x0) * self.roi_padding / (1 + 2 * self.roi_padding) / 2
+            margin_y = (y1 - y0) * self.roi_padding / (1 + 2 * self.roi_padding) / 2
+            # Edges clamped to the frame border cannot lose the person
+            if ((x0 <= 0.0 or x_min >= x0 + margin_x) and (x1 >= 1.0 or x_max <= x1 - margin_x)
+                    and (y0 <= 0.0 or y_min >= y0 + margin_y) and (y1 >= 1.0 or y_max <= y1 - margin_y)):
+                return
 
-        radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(
-            a[1] - b[1], a[0] - b[0]
+        # Pad the person's box, square it up in pixels so limbs swinging
+        # out sideways stay in view, and clamp it to the frame
+        half_w = (x_max - x_min) / 2 * (1 + 2 * self.roi_padding)
+        half_h = (y_max - y_min) / 2 * (1 + 2 * self.roi_padding)
+        half_w = max(half_w, half_h / aspect)
+        half_h = max(half_h, half_w * aspect)
+        center_x, center_y = (x_min + x_max) / 2, (y_min + y_max) / 2
+        roi = (
+            max(0.0, float(center_x - half_w)), max(0.0, float(center_y - half_h)),
+            min(1.0, float(center_x + half_w)), min(1.0, float(center_y + half_h))
         )
-        angle = np.abs(radians * 180.0 / np.pi)
-
-        if angle > 180.0:
-            angle = 360 - angle
 
-        return angle
-    
-    def draw_landmarks(self, image, results):
-        """
-        Draw pose landmarks on the image.
-        
-        Args:
-            image: BGR image to draw on
-            results: MediaPipe pose detection results
-            
-        Returns:
-            image: Image with landmarks drawn
-        """
-        if results.pose_landmarks:
-            # Draw skeleton with bright, visible colors
-            # Landmarks (joints): bright green circles
-            # Connections (bones): bright magenta/pink lines
-            self.mp_drawing.draw_landmarks(
-                image,
-                results.pose_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=3, circle_radius=5),
-                self.mp_drawing.DrawingSpec(color=(255, 0, 255), thickness=3, circle_radius=3)
-            )
-        return image
+        if roi[2] - roi[0] >= 0.9 and roi[3] - roi[1] >= 0.9:
+            # Cropping would save next to nothing
+            roi = None
+        elif roi[2] - roi[0] < MIN_ROI_SIZE or roi[3] - roi[1] < MIN_ROI_SIZE:
+            # Landmarks outside the frame clamp to an empty or sliver box
+            roi = None
+        if roi != self.roi:
+            self.roi = roi
+            self.pose.reset()
     
-    def landmarks_detected(self):
-        """Check if landmarks were detected in the last frame."""
-        return self.landmarks is not None
+    def reset(self):
+        """Clear tracking state so the next frame is treated as a fresh detection."""
+        for graph in self._graphs.values():
+            graph.reset()
+        self.landmarks = None
+        self.roi = None
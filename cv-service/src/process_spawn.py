@@ -0,0 +1,35 @@
+"""
+Process Spawn Module
+Starts spawn-context child processes without re-running the main script.
+
+A spawned child re-imports the parent's __main__ script as __mp_main__
+before it runs its target, so under `python app.py` every inference or
+video worker would repeat all of app.py's module-level setup (stores,
+limiter, executors, pose graphs). Started inside main_hidden(), children
+only import the modules their target and arguments live in, which must
+import without side effects.
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+
+_lock = threading.RLock()
+
+
+@contextmanager
+def main_hidden():
+    """Hide the main module's file and spec from child processes started inside."""
+    with _lock:
+        main = sys.modules.get('__main__')
+        saved = {}
+        if main is not None:
+            saved = {name: main.__dict__[name] for name in ('__file__', '__spec__')
+                     if name in main.__dict__}
+            main.__dict__.pop('__file__', None)
+            main.__spec__ = None
+        try:
+            yield
+        finally:
+            if main is not None:
+                main.__dict__.update(saved)
@@ -0,0 +1,133 @@
+"""
+Quality Controller Module
+Steps sessions down to cheaper inference settings when latency runs over budget.
+
+Every processed frame reports how long inference took (including the
+wait for a pose graph). The controller keeps a moving average per
+session and for the whole process. While either is over the latency
+budget, a session drops one tier at a time; once both are comfortably
+under it again, the session climbs back one tier at a time. Tiers get
+cheaper in this order: lite model, smaller input, no server-side
+annotation, lower recommended client frame rate.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Quality tiers from best to cheapest. input_size None keeps the
+# detector's configured max_input_size.
+QUALITY_TIERS = (
+    {'name': 'full', 'model_complexity': 1, 'input_size': None, 'annotate': True, 'recommended_fps': 10},
+    {'name': 'lite', 'model_complexity': 0, 'input_size': None, 'annotate': True, 'recommended_fps': 10},
+    {'name': 'small_input', 'model_complexity': 0, 'input_size': 320, 'annotate': True, 'recommended_fps': 10},
+    {'name': 'no_annotation', 'model_complexity': 0, 'input_size': 320, 'annotate': False, 'recommended_fps': 10},
+    {'name': 'low_fps', 'model_complexity': 0, 'input_size': 320, 'annotate': False, 'recommended_fps': 5},
+)
+
+
+class _SessionQuality:
+    """Tier and latency average of one session."""
+
+    __slots__ = ('level', 'latency_ms', 'frames_since_change')
+
+    def __init__(self):
+        self.level = 0
+        self.latency_ms = None
+        self.frames_since_change = 0
+
+
+def _average(current, sample, smoothing):
+    return sample if current is None else current + smoothing * (sample - current)
+
+
+class QualityController:
+    """
+    Per-session adaptive quality driven by a latency budget.
+
+    tier() tells the request path how to run a session's next frame and
+    observe() feeds back how long it took.
+    """
+
+    def __init__(self, budget_ms=200.0, headroom=0.6, smoothing=0.2,
+                 min_frames_between_changes=10, max_sessions=10000):
+        """
+        Initialize the controller.
+
+        Args:
+            budget_ms: Target inference latency per frame
+            headroom: Step back up only while latency is below budget_ms * headroom
+            smoothing: Weight of the newest sample in the moving averages
+            min_frames_between_changes: Frames a session stays on a tier
+                before it can change again, so averages can settle
+            max_sessions: Sessions to keep quality state for
+        """
+        self.budget_ms = budget_ms
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.min_frames_between_changes = min_frames_between_changes
+        self.max_sessions = max_sessions
+        self.process_latency_ms = None
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionQuality()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def tier(self, session_id):
+        """
+        Get the quality tier a session's next frame should use.
+
+        Returns:
+            dict: A QUALITY_TIERS entry plus its "level" index
+        """
+        with self._lock:
+            level = self._session(session_id).level
+        return dict(QUALITY_TIERS[level], level=level)
+
+    def observe(self, session_id, latency_ms):
+        """
+        Record one frame's inference latency and adjust the session's tier.
+
+        Returns:
+            int: The session's tier level after this frame
+        """
+        with self._lock:
+            session = self._session(session_id)
+            session.latency_ms = _average(session.latency_ms, latency_ms, self.smoothing)
+            self.process_latency_ms = _average(self.process_latency_ms, latency_ms, self.smoothing)
+            session.frames_since_change += 1
+
+            if session.frames_since_change >= self.min_frames_between_changes:
+                worst = max(session.latency_ms, self.process_latency_ms)
+                if worst > self.budget_ms and session.level < len(QUALITY_TIERS) - 1:
+                    session.level += 1
+                    session.frames_since_change = 0
+                elif worst < self.budget_ms * self.headroom and session.level > 0:
+                    session.level -= 1
+                    session.frames_since_change = 0
+            return session.level
+
+    def release(self, session_id):
+        """Drop a session's quality state."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        """Get the budget, process latency and how many sessions sit on each tier."""
+        with self._lock:
+            levels = [session.level for session in self._sessions.values()]
+            process_latency = self.process_latency_ms
+        return {
+            'budget_ms': self.budget_ms,
+            'process_latency_ms': None if process_latency is None else round(process_latency, 1),
+            'sessions_per_tier': {
+                tier['name']: levels.count(level) for level, tier in enumerate(QUALITY_TIERS)
+            }
+        }
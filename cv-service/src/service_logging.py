@@ -0,0 +1,179 @@
+"""
+Service Logging Module
+Structured, queue-backed logging with per-session sampling of frame logs.
+
+Request threads only put log records on a queue; a background listener
+thread formats them and writes to stdout, so a slow or unbuffered
+stdout never stalls a frame. When the queue is full records are dropped
+and counted rather than blocking.
+
+Per-frame debug lines would flood the logs at 10 FPS per session, so
+they go through a FrameLogSampler: one frame in every N per session is
+logged, plus every frame of sessions switched into debug on demand.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level='INFO', fmt='json', queue_size=10000, stream=None):
+    """
+    Route the root logger through a background writer thread.
+
+    Safe to call more than once; later calls replace the handlers.
+
+    Args:
+        level: Root log level name or number
+        fmt: 'json' for one JSON object per line, 'text' for plain lines
+        queue_size: Records buffered before new ones are dropped
+        stream: Output stream (default: stdout)
+
+    Returns:
+        DroppingQueueHandler: The handler installed on the root logger
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == 'json':
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return handler
+
+
+def _stop_listener():
+    # Flushes whatever is still queued at interpreter exit
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
+
+
+class FrameLogSampler:
+    """
+    Decides which frames of which sessions get a debug log line.
+
+    Frame counters are kept for at most max_sessions sessions, least
+    recently used first out.
+    """
+
+    def __init__(self, every=100, max_sessions=10000):
+        """
+        Initialize the sampler.
+
+        Args:
+            every: Log one in this many frames per session (0 = only debug sessions)
+            max_sessions: Sessions to keep frame counters for
+        """
+        self.every = every
+        self.max_sessions = max_sessions
+        self._frames = OrderedDict()
+        # session_id -> monotonic time its on-demand debug ends
+        self._debug = {}
+        self._lock = threading.Lock()
+
+    def should_log(self, session_id):
+        """Count a frame of a session and tell whether to log it."""
+        with self._lock:
+            until = self._debug.get(session_id)
+            if until is not None:
+                if time.monotonic() < until:
+                    return True
+                del self._debug[session_id]
+
+            if not self.every:
+                return False
+            frames = self._frames.get(session_id, 0) + 1
+            self._frames[session_id] = frames
+            self._frames.move_to_end(session_id)
+            while len(self._frames) > self.max_sessions:
+                self._frames.popitem(last=False)
+            # The first frame of a session is always logged
+            return frames % self.every == 1 or self.every == 1
+
+    def set_debug(self, session_id, enabled=True, duration=300.0):
+        """
+        Log every frame of one session for a while.
+
+        Args:
+            session_id: Session to debug
+            enabled: False switches debugging off again
+            duration: Seconds until debugging switches itself off
+        """
+        with self._lock:
+            if enabled:
+                self._debug[session_id] = time.monotonic() + duration
+            else:
+                self._debug.pop(session_id, None)
+
+    def debug_sessions(self):
+        """Get the sessions in debug mode and their remaining seconds."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                session_id: round(until - now, 1)
+                for session_id, until in self._debug.items() if until > now
+            }
+
+    def release(self, session_id):
+        """Drop a session's frame counter and debug mode."""
+        with self._lock:
+            self._frames.pop(session_id, None)
+            self._debug.pop(session_id, None)
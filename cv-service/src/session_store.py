@@ -0,0 +1,415 @@
+"""
+Session Store Module
+Pluggable storage for per-session exercise detector state.
+
+The in-process backend keeps live detector objects in a dict and only
+works with a single gunicorn worker. The SQLite backend stores each
+detector as a compact JSON record, so any worker process on the host can
+serve any frame with one read-modify-write per frame. Point
+SESSION_STORE_PATH at /dev/shm to keep the database in shared memory.
+
+Both backends track when each session was last seen; SessionSweeper
+evicts idle sessions and caps the total in the background.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from exercise_detectors import get_detector, detector_from_record
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Abstract base class for session state storage."""
+
+    @abstractmethod
+    @contextmanager
+    def checkout(self, session_id, exercise_type):
+        """
+        Read-modify-write a session's detector.
+
+        Yields the detector (created if missing); changes made inside the
+        block are saved when it exits without an exception.
+        """
+
+    @abstractmethod
+    def get(self, session_id, exercise_type):
+        """Get a session's detector, or None if it does not exist."""
+
+    @abstractmethod
+    def reset(self, session_id, exercise_type):
+        """Replace a session's detector with a fresh one."""
+
+    @abstractmethod
+    def delete_session(self, session_id):
+        """
+        Remove every detector belonging to a session.
+
+        Returns:
+            int: Number of detectors removed
+        """
+
+    @abstractmethod
+    def list_sessions(self, offset=0, limit=None):
+        """
+        List sessions in a stable order, one page at a time.
+
+        Returns:
+            list of (session_id, {exercise_type: detector}) pairs
+        """
+
+    @abstractmethod
+    def session_count(self):
+        """Get the number of stored sessions."""
+
+    @abstractmethod
+    def evict(self, idle_ttl=None, max_sessions=None):
+        """
+        Drop sessions idle longer than idle_ttl seconds, then the least
+        recently seen sessions beyond max_sessions.
+
+        Returns:
+            list: Evicted session ids
+        """
+
+    @abstractmethod
+    def memory_stats(self):
+        """Get session counts and approximate storage size."""
+
+
+class InProcessStore(SessionStore):
+    """
+    Keeps detector objects in process memory, indexed by session.
+
+    Sessions are kept in least-recently-seen order, so cleanup of one
+    session and eviction of the oldest are both O(1).
+    """
+
+    def __init__(self):
+        # session_id -> {exercise_type: detector}, least recently seen first
+        self._sessions = OrderedDict()
+        self._last_seen = {}
+        # session_id -> lock held for a whole checkout of that session
+        self._session_locks = {}
+        self._lock = threading.Lock()
+
+    def _session_lock(self, session_id):
+        """Get the lock serializing a session's read-modify-writes."""
+        with self._lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
+
+    def _touch(self, session_id):
+        """Get a session's detectors and mark it as just seen (lock held)."""
+        detectors = self._sessions.get(session_id)
+        if detectors is None:
+            detectors = self._sessions[session_id] = {}
+        else:
+            self._sessions.move_to_end(session_id)
+        self._last_seen[session_id] = time.monotonic()
+        return detectors
+
+    @contextmanager
+    def checkout(self, session_id, exercise_type):
+        # Held until the block exits, like SQLiteStore's BEGIN IMMEDIATE, so
+        # concurrent updates of the same session cannot interleave
+        with self._session_lock(session_id):
+            with self._lock:
+                detectors = self._touch(session_id)
+                detector = detectors.get(exercise_type)
+                if detector is None:
+                    detector = detectors[exercise_type] = get_detector(exercise_type)
+            yield detector
+
+    def get(self, session_id, exercise_type):
+        return self._sessions.get(session_id, {}).get(exercise_type)
+
+    def reset(self, session_id, exercise_type):
+        with self._session_lock(session_id), self._lock:
+            self._touch(session_id)[exercise_type] = get_detector(exercise_type)
+
+    def delete_session(self, session_id):
+        with self._lock:
+            self._last_seen.pop(session_id, None)
+            self._session_locks.pop(session_id, None)
+            return len(self._sessions.pop(session_id, {}))
+
+    def list_sessions(self, offset=0, limit=None):
+        with self._lock:
+            session_ids = list(self._sessions)
+            stop = None if limit is None else offset + limit
+            return [
+                (session_id, dict(self._sessions[session_id]))
+                for session_id in session_ids[offset:stop]
+            ]
+
+    def session_count(self):
+        return len(self._sessions)
+
+    def evict(self, idle_ttl=None, max_sessions=None):
+        cutoff = None if idle_ttl is None else time.monotonic() - idle_ttl
+        evicted = []
+        with self._lock:
+            # Oldest first, so stop at the first session that may stay
+            while self._sessions:
+                session_id = next(iter(self._sessions))
+                expired = cutoff is not None and self._last_seen[session_id] < cutoff
+                overflow = max_sessions is not None and len(self._sessions) > max_sessions
+                if not (expired or overflow):
+                    break
+                del self._sessions[session_id]
+                del self._last_seen[session_id]
+                self._session_locks.pop(session_id, None)
+                evicted.append(session_id)
+        return evicted
+
+    def memory_stats(self):
+        with self._lock:
+            detectors = [d for ds in self._sessions.values() for d in ds.values()]
+            approx_bytes = (
+                sys.getsizeof(self._sessions) + sys.getsizeof(self._last_seen)
+                + sum(sys.getsizeof(ds) for ds in self._sessions.values())
+                + sum(sys.getsizeof(d) + sys.getsizeof(d.__dict__) for d in detectors)
+            )
+            return {
+                'sessions': len(self._sessions),
+                'detectors': len(detectors),
+                'approx_bytes': approx_bytes
+            }
+
+
+class SQLiteStore(SessionStore):
+    """Stores detector records in a SQLite database shared by worker processes."""
+
+    def __init__(self, path):
+        """
+        Open (and create if needed) the session database.
+
+        Args:
+            path: Database file path, e.g. /dev/shm/fitform_sessions.db
+        """
+        self.path = path
+        self._local = threading.local()
+        # A connection must not be used across fork (gunicorn preload_app);
+        # forked workers open their own
+        os.register_at_fork(after_in_child=self._forget_connections)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS detectors ('
+            ' session_id TEXT NOT NULL,'
+            ' exercise_type TEXT NOT NULL,'
+            ' record TEXT NOT NULL,'
+            ' updated_at REAL NOT NULL,'
+            ' PRIMARY KEY (session_id, exercise_type)'
+            ') WITHOUT ROWID'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS detectors_updated ON detectors (updated_at)')
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        """One connection per thread; sqlite3 connections are not thread-safe."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(detector):
+        return json.dumps(detector.to_record(), separators=(',', ':'))
+
+    def _write(self, conn, session_id, exercise_type, detector):
+        conn.execute(
+            'INSERT OR REPLACE INTO detectors VALUES (?, ?, ?, ?)',
+            (session_id, exercise_type, self._encode(detector), time.time())
+        )
+
+    @contextmanager
+    def checkout(self, session_id, exercise_type):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so concurrent
+        # read-modify-writes of the same session cannot interleave
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT record FROM detectors WHERE session_id = ? AND exercise_type = ?',
+                (session_id, exercise_type)
+            ).fetchone()
+            detector = detector_from_record(exercise_type, json.loads(row[0]) if row else None)
+            yield detector
+            self._write(conn, session_id, exercise_type, detector)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, session_id, exercise_type):
+        row = self._connection().execute(
+            'SELECT record FROM detectors WHERE session_id = ? AND exercise_type = ?',
+            (session_id, exercise_type)
+        ).fetchone()
+        if row is None:
+            return None
+        return detector_from_record(exercise_type, json.loads(row[0]))
+
+    def reset(self, session_id, exercise_type):
+        self._write(self._connection(), session_id, exercise_type, get_detector(exercise_type))
+
+    def delete_session(self, session_id):
+        cursor = self._connection().execute(
+            'DELETE FROM detectors WHERE session_id = ?', (session_id,)
+        )
+        return cursor.rowcount
+
+    def list_sessions(self, offset=0, limit=None):
+        conn = self._connection()
+        session_ids = [row[0] for row in conn.execute(
+            'SELECT DISTINCT session_id FROM detectors ORDER BY session_id LIMIT ? OFFSET ?',
+            (-1 if limit is None else limit, offset)
+        )]
+        if not session_ids:
+            return []
+        placeholders = ','.join('?' * len(session_ids))
+        sessions = {session_id: {} for session_id in session_ids}
+        for session_id, exercise_type, record in conn.execute(
+            f'SELECT session_id, exercise_type, record FROM detectors WHERE session_id IN ({placeholders})',
+            session_ids
+        ):
+            sessions[session_id][exercise_type] = detector_from_record(exercise_type, json.loads(record))
+        return list(sessions.items())
+
+    def session_count(self):
+        return self._connection().execute(
+            'SELECT COUNT(DISTINCT session_id) FROM detectors'
+        ).fetchone()[0]
+
+    def evict(self, idle_ttl=None, max_sessions=None):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # A session's age is that of its most recently updated detector
+            query = 'SELECT session_id, MAX(updated_at) AS seen FROM detectors GROUP BY session_id'
+            evicted = []
+            if idle_ttl is not None:
+                evicted += [row[0] for row in conn.execute(
+                    f'SELECT session_id FROM ({query}) WHERE seen < ?', (time.time() - idle_ttl,)
+                )]
+            if max_sessions is not None:
+                remaining = conn.execute(
+                    f'SELECT session_id FROM ({query}) ORDER BY seen DESC LIMIT -1 OFFSET ?',
+                    (max_sessions,)
+                ).fetchall()
+                already = set(evicted)
+                evicted += [row[0] for row in remaining if row[0] not in already]
+            conn.executemany('DELETE FROM detectors WHERE session_id = ?', [(e,) for e in evicted])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return evicted
+
+    def memory_stats(self):
+        conn = self._connection()
+        sessions, detectors = conn.execute(
+            'SELECT COUNT(DISTINCT session_id), COUNT(*) FROM detectors'
+        ).fetchone()
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return {
+            'sessions': sessions,
+            'detectors': detectors,
+            'approx_bytes': page_count * page_size
+        }
+
+
+class SessionSweeper:
+    """
+    Background thread that periodically evicts idle and excess sessions.
+
+    Callbacks registered with on_evict are called with each evicted
+    session id, so other per-session resources (pose graph affinity,
+    caches) are freed together with the detector state.
+    """
+
+    def __init__(self, store, idle_ttl=None, max_sessions=None, interval=60.0):
+        """
+        Initialize the sweeper (call start() to run it).
+
+        Args:
+            store: SessionStore to sweep
+            idle_ttl: Seconds without frames before a session is dropped
+            max_sessions: Maximum number of sessions to keep
+            interval: Seconds between sweeps
+        """
+        self.store = store
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.interval = interval
+        self.evicted_total = 0
+        self._callbacks = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on_evict(self, callback):
+        """Register a callback called with each evicted session id."""
+        self._callbacks.append(callback)
+        return callback
+
+    def sweep(self):
+        """Run one eviction pass now."""
+        evicted = self.store.evict(idle_ttl=self.idle_ttl, max_sessions=self.max_sessions)
+        self.evicted_total += len(evicted)
+        for session_id in evicted:
+            for callback in self._callbacks:
+                callback(session_id)
+        return evicted
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Session sweep failed')
+
+    def start(self):
+        """Start sweeping in a daemon thread (again after a fork)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='session-sweeper', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+
+
+def create_store(backend=None, path=None):
+    """
+    Build the session store selected by configuration.
+
+    Args:
+        backend: 'memory' or 'sqlite' (defaults to SESSION_STORE, then 'memory')
+        path: SQLite file (defaults to SESSION_STORE_PATH)
+    """
+    backend = (backend or os.environ.get('SESSION_STORE', 'memory')).lower()
+    if backend == 'memory':
+        return InProcessStore()
+    if backend == 'sqlite':
+        path = path or os.environ.get('SESSION_STORE_PATH', '/tmp/fitform_sessions.db')
+        return SQLiteStore(path)
+    raise ValueError(f"Unknown session store backend: {backend}")
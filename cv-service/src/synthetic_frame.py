@@ -0,0 +1,51 @@
+"""
+Synthetic Frame Module
+Draws a flat-shaded figure that MediaPipe detects, without any image assets.
+
+Used to warm up pose graphs at boot, so the first real frame does not
+pay for the landmark model's first run, and by the benchmark corpus.
+"""
+
+import cv2
+import numpy as np
+
+_WALL = (200, 210, 220)
+_SKIN = (150, 180, 230)
+_SHIRT = (60, 60, 180)
+_PANTS = (90, 60, 30)
+
+
+def draw_figure(width, height, bend):
+    """
+    Draw a front-facing figure squatting to the given depth.
+
+    Args:
+        width: Frame width in pixels
+        height: Frame height in pixels
+        bend: Squat depth from 0 (standing) to 1 (deepest)
+
+    Returns:
+        np.ndarray: BGR image
+    """
+    image = np.full((height, width, 3), _WALL, np.uint8)
+    cx = width // 2
+    h = height
+    # Squatting lowers the upper body and pushes the knees outwards
+    drop = int(h * 0.12 * bend)
+
+    cv2.ellipse(image, (cx, int(h * 0.15) + drop), (int(h * 0.05), int(h * 0.065)), 0, 0, 360, _SKIN, -1)
+    cv2.rectangle(image, (cx - int(h * 0.09), int(h * 0.22) + drop),
+                  (cx + int(h * 0.09), int(h * 0.52) + drop), _SHIRT, -1)
+    for side in (-1, 1):
+        shoulder = (cx + side * int(h * 0.09), int(h * 0.24) + drop)
+        elbow = (cx + side * int(h * (0.16 + 0.04 * bend)), int(h * 0.38) + drop)
+        wrist = (cx + side * int(h * (0.18 + 0.02 * bend)), int(h * (0.52 - 0.06 * bend)) + drop)
+        cv2.line(image, shoulder, elbow, _SHIRT, int(h * 0.04))
+        cv2.line(image, elbow, wrist, _SKIN, int(h * 0.035))
+
+        hip = (cx + side * int(h * 0.05), int(h * 0.52) + drop)
+        knee = (cx + side * int(h * (0.07 + 0.08 * bend)), int(h * (0.72 + 0.04 * bend)))
+        ankle = (cx + side * int(h * 0.08), int(h * 0.92))
+        cv2.line(image, hip, knee, _PANTS, int(h * 0.06))
+        cv2.line(image, knee, ankle, _PANTS, int(h * 0.05))
+    return image
@@ -0,0 +1,253 @@
+"""
+Video Analysis Module
+Offline rep counting for recorded workout videos.
+
+Long videos are split into overlapping chunks that are processed in
+parallel worker processes and stitched back together. Each chunk starts
+a little before its own range so MediaPipe tracking and the exercise
+state machine are primed; reps completed during that warm-up belong to
+the previous chunk and are not counted twice.
+
+Frames are timed from their position in the video, as live frames are
+by their capture timestamps, so a video and a live session of the same
+footage count alike.
+
+Usage:
+    python video_analysis.py workout.mp4 --exercise squat --workers 4
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from exercise_detectors import get_detector, SUPPORTED_EXERCISES
+from landmark_frame import LandmarkFrame
+from process_spawn import main_hidden
+
+# Per-process pose detector, created once by the pool initializer
+_worker_pose = None
+
+
+def _init_worker():
+    """Build one PoseDetector per worker process."""
+    global _worker_pose
+    from pose_detector import PoseDetector
+    _worker_pose = PoseDetector()
+
+
+def probe_video(path):
+    """
+    Read basic stream properties.
+
+    Many WebM and streamed containers report no frame count; those are
+    counted by grabbing (not decoding) frames up to the end.
+
+    Returns:
+        dict: frame_count, fps, width and height
+
+    Raises:
+        ValueError: If the video cannot be opened or has no readable frames
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f'Cannot open video: {path}')
+    try:
+        info = {
+            'frame_count': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'fps': cap.get(cv2.CAP_PROP_FPS) or 30.0,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        }
+        if info['frame_count'] <= 0:
+            info['frame_count'] = sum(1 for _ in iter(cap.grab, False))
+    finally:
+        cap.release()
+
+    if info['frame_count'] <= 0:
+        raise ValueError(f'No readable frames in video: {path}')
+    return info
+
+
+def plan_chunks(frame_count, fps, chunk_seconds=30.0, overlap_seconds=2.0):
+    """
+    Split a video into chunks with a warm-up overlap.
+
+    Returns:
+        list of (warmup_start, start, end) frame indices; end is exclusive
+    """
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    overlap_frames = max(0, int(overlap_seconds * fps))
+    chunks = []
+    for start in range(0, frame_count, chunk_frames):
+        end = min(start + chunk_frames, frame_count)
+        chunks.append((max(0, start - overlap_frames), start, end))
+    return chunks
+
+
+def analyze_chunk(path, exercise_type, warmup_start, start, end, frame_step=1):
+    """
+    Count reps in frames [start, end) of a video.
+
+    Frames from warmup_start are fed through the detectors first so
+    tracking and stage are established, but only reps completed at or
+    after start are reported. Frames are streamed from disk one at a
+    time; skipped frames (frame_step > 1) are grabbed without decoding.
+    With end None the chunk runs to the end of the video, in case the
+    container's frame count is short.
+
+    Returns:
+        dict: Chunk range, reps, frames processed and the final stage
+    """
+    pose = _worker_pose
+    if pose is None:
+        _init_worker()
+        pose = _worker_pose
+    pose.reset()
+
+    detector = get_detector(exercise_type)
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    baseline = 0 if warmup_start == start else None
+    processed = 0
+    detected = 0
+    began = time.perf_counter()
+    index = warmup_start
+    frames = range(warmup_start, end) if end is not None else itertools.count(warmup_start)
+    try:
+        for index in frames:
+            if index == start:
+                baseline = detector.count
+
+            if index % frame_step:
+                if not cap.grab():
+                    break
+                continue
+
+            ok, frame = cap.read()
+            if not ok:
+                break
+            landmarks = pose.detect(frame)
+            processed += 1
+            frame_view = LandmarkFrame(landmarks)
+            if frame_view.landmarks_detected():
+                detected += 1
+                detector.detect(frame_view, index / fps)
+    finally:
+        cap.release()
+
+    if baseline is None:
+        baseline = detector.count
+
+    return {
+        'start': start,
+        'end': end if end is not None else max(start, index),
+        'reps': detector.count - baseline,
+        'frames_processed': processed,
+        'frames_with_landmarks': detected,
+        'final_stage': detector.stage,
+        'seconds': round(time.perf_counter() - began, 3)
+    }
+
+
+def _analyze_chunk_args(args):
+    return analyze_chunk(*args)
+
+
+def analyze_video(path, exercise_type, workers=None, chunk_seconds=30.0,
+                  overlap_seconds=2.0, frame_step=1):
+    """
+    Count reps in a recorded video using a pool of worker processes.
+
+    Args:
+        path: Path to a video file readable by cv2.VideoCapture
+        exercise_type: One of SUPPORTED_EXERCISES
+        workers: Number of worker processes (defaults to CPU count)
+        chunk_seconds: Length of each chunk
+        overlap_seconds: Warm-up overlap before each chunk
+        frame_step: Process every Nth frame (3 matches the 10 FPS live client at 30 FPS)
+
+    Returns:
+        dict: Stitched rep count, per-chunk results and throughput
+
+    Raises:
+        ValueError: If the exercise is unsupported or the video unreadable
+    """
+    if exercise_type not in SUPPORTED_EXERCISES:
+        raise ValueError(f'Unsupported exercise type. Supported: {SUPPORTED_EXERCISES}')
+
+    info = probe_video(path)
+    chunks = plan_chunks(info['frame_count'], info['fps'], chunk_seconds, overlap_seconds)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+    tasks = [(path, exercise_type, w, s, e, frame_step) for w, s, e in chunks]
+    # The frame count may be short; the last chunk reads to the end
+    tasks[-1] = tasks[-1][:4] + (None,) + tasks[-1][5:]
+
+    began = time.perf_counter()
+    if workers == 1:
+        results = [_analyze_chunk_args(task) for task in tasks]
+    else:
+        # spawn keeps MediaPipe's native threads out of forked children
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker) as executor:
+            # map() submits every task, starting the worker processes
+            with main_hidden():
+                chunks_done = executor.map(_analyze_chunk_args, tasks)
+            results = list(chunks_done)
+    elapsed = time.perf_counter() - began
+
+    reps = sum(chunk['reps'] for chunk in results)
+    processed = sum(chunk['frames_processed'] for chunk in results)
+    busy = sum(chunk['seconds'] for chunk in results)
+    calories_per_rep = get_detector(exercise_type).calories_per_rep
+
+    return {
+        'exercise_type': exercise_type,
+        'count': reps,
+        'calories_burned': round(reps * calories_per_rep, 2),
+        'final_stage': results[-1]['final_stage'] if results else None,
+        'video': info,
+        'workers': workers,
+        'chunks': results,
+        'frames_processed': processed,
+        'elapsed_seconds': round(elapsed, 3),
+        'frames_per_second': round(processed / elapsed, 2) if elapsed else 0.0,
+        'frames_per_second_per_worker': round(processed / busy, 2) if busy else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count reps in a recorded workout video.')
+    parser.add_argument('video', help='Path to the video file')
+    parser.add_argument('--exercise', default='pushup', choices=SUPPORTED_EXERCISES)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-seconds', type=float, default=30.0)
+    parser.add_argument('--overlap-seconds', type=float, default=2.0)
+    parser.add_argument('--frame-step', type=int, default=1, help='Process every Nth frame')
+    args = parser.parse_args()
+
+    # Go through the importable module so the worker processes, which
+    # are started without this script (see process_spawn), can find the
+    # chunk function
+    from video_analysis import analyze_video as analyze
+    result = analyze(
+        args.video,
+        args.exercise,
+        workers=args.workers,
+        chunk_seconds=args.chunk_seconds,
+        overlap_seconds=args.overlap_seconds,
+        frame_step=args.frame_step
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Video Jobs Module
+Status and results of offline video analysis jobs.
+
+A job runs in the gunicorn worker that received the upload, but its
+status may be polled through any worker. The SQLite backend keeps jobs
+in one database file so every worker on the host sees them; the
+in-process backend is only correct with a single worker.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+FINISHED_STATUSES = ('done', 'failed')
+
+
+class JobStore(ABC):
+    """Abstract base class for video job storage."""
+
+    @abstractmethod
+    def create(self, job_id, job, max_jobs):
+        """Add a job, first forgetting the oldest finished ones beyond max_jobs."""
+
+    @abstractmethod
+    def update(self, job_id, **fields):
+        """Merge fields into a job's record."""
+
+    @abstractmethod
+    def get(self, job_id):
+        """Get a job's record, or None if unknown."""
+
+
+class InProcessJobs(JobStore):
+    """Jobs in a dict; only correct with a single gunicorn worker."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, job, max_jobs):
+        with self._lock:
+            finished = [key for key, record in self._jobs.items()
+                        if record['status'] in FINISHED_STATUSES]
+            for key in finished[:max(0, len(self._jobs) - max_jobs + 1)]:
+                del self._jobs[key]
+            self._jobs[job_id] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+class SQLiteJobs(JobStore):
+    """Jobs in a SQLite database shared by the worker processes of a host."""
+
+    def __init__(self, path):
+        """
+        Open (and create if needed) the job database.
+
+        Args:
+            path: Database file path, e.g. /dev/shm/fitform_video_jobs.db
+        """
+        self.path = path
+        self._local = threading.local()
+        # A connection must not be used across fork (gunicorn preload_app);
+        # forked workers open their own
+        os.register_at_fork(after_in_child=self._forget_connections)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' job_id TEXT PRIMARY KEY,'
+            ' record TEXT NOT NULL,'
+            ' finished INTEGER NOT NULL,'
+            ' created_at REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        """One connection per thread; sqlite3 connections are not thread-safe."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id, job, max_jobs):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            total = conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+            excess = total - max_jobs + 1
+            if excess > 0:
+                conn.execute(
+                    'DELETE FROM jobs WHERE job_id IN ('
+                    ' SELECT job_id FROM jobs WHERE finished = 1 ORDER BY created_at LIMIT ?)',
+                    (excess,)
+                )
+            conn.execute(
+                'INSERT INTO jobs VALUES (?, ?, ?, ?)',
+                (job_id, json.dumps(job), int(job['status'] in FINISHED_STATUSES), time.time())
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def update(self, job_id, **fields):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT record FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            if row is not None:
+                job = {**json.loads(row[0]), **fields}
+                conn.execute(
+                    'UPDATE jobs SET record = ?, finished = ? WHERE job_id = ?',
+                    (json.dumps(job), int(job['status'] in FINISHED_STATUSES), job_id)
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            'SELECT record FROM jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+
+def create_job_store(backend=None, path=None):
+    """
+    Build the video job store selected by configuration.
+
+    Args:
+        backend: 'memory' or 'sqlite' (defaults to VIDEO_JOB_STORE, then
+            SESSION_STORE, then 'memory')
+        path: SQLite file (defaults to VIDEO_JOB_PATH)
+    """
+    backend = (
+        backend or os.environ.get('VIDEO_JOB_STORE') or os.environ.get('SESSION_STORE', 'memory')
+    ).lower()
+    if backend == 'memory':
+        return InProcessJobs()
+    if backend == 'sqlite':
+        path = path or os.environ.get('VIDEO_JOB_PATH', '/tmp/fitform_video_jobs.db')
+        return SQLiteJobs(path)
+    raise ValueError(f"Unknown video job store backend: {backend}")
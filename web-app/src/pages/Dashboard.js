@@ -10,7 +10,7 @@ import { workoutAPI } from '../services/api';
 import './Dashboard.css';
 
 // Catppuccin Mocha colors
-const COLORS = ['#cba6f7', '#a6e3a1', '#f9e2af']; // Mauve, Green, Yellow
+const COLORS = ['#cba6f7', '#a6e3a1', '#f9e2af', '#89b4fa']; // Mauve, Green, Yellow, Blue
 const CHART_COLORS = {
   bar: '#cba6f7',        // Mauve
   barGradient: '#89b4fa', // Blue
@@ -59,7 +59,8 @@ const Dashboard = () => {
   const chartData = stats ? [
     { name: 'Push-ups', reps: stats.byExercise.pushup?.reps || 0, calories: stats.byExercise.pushup?.calories || 0 },
     { name: 'Squats', reps: stats.byExercise.squat?.reps || 0, calories: stats.byExercise.squat?.calories || 0 },
-    { name: 'Sit-ups', reps: stats.byExercise.situp?.reps || 0, calories: stats.byExercise.situp?.calories || 0 }
+    { name: 'Sit-ups', reps: stats.byExercise.situp?.reps || 0, calories: stats.byExercise.situp?.calories || 0 },
+    { name: 'Lunges', reps: stats.byExercise.lunge?.reps || 0, calories: stats.byExercise.lunge?.calories || 0 }
   ] : [];
 
   const pieData = chartData.filter(d => d.reps > 0);
@@ -251,6 +252,7 @@ const Dashboard = () => {
                   {workout.exerciseType === 'pushup' && '💪'}
                   {workout.exerciseType === 'squat' && '🦵'}
                   {workout.exerciseType === 'situp' && '🏋️'}
+                  {workout.exerciseType === 'lunge' && '🚶'}
                 </div>
                 <div className="workout-info">
                   <div className="workout-name">
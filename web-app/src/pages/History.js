@@ -72,6 +72,7 @@ const History = () => {
       case 'pushup': return '💪';
       case 'squat': return '🦵';
       case 'situp': return '🏋️';
+      case 'lunge': return '🚶';
       default: return '🏃';
     }
   };
@@ -105,6 +106,12 @@ const History = () => {
           >
             🏋️ Sit-ups
           </button>
+          <button
+            className={`filter-btn ${filter === 'lunge' ? 'active' : ''}`}
+            onClick={() => { setFilter('lunge'); setOffset(0); }}
+          >
+            🚶 Lunges
+          </button>
         </div>
       </div>
 
@@ -8,14 +8,56 @@ import Webcam from 'react-webcam';
 import { cvAPI, workoutAPI } from '../services/api';
 import './Workout.css';
 
+// Stream frames over a WebSocket instead of one HTTP request per frame
+const USE_STREAMING = process.env.REACT_APP_CV_STREAMING === 'true';
+
+// Skeleton colors, matching the server-rendered overlay
+const BONE_COLOR = '#ff00ff';
+const JOINT_COLOR = '#00ff00';
+const VISIBILITY_THRESHOLD = 0.5;
+
+// Capture rate until the server recommends another (quality.recommended_fps)
+const DEFAULT_FPS = 10;
+
+// Draw landmarks returned with output_mode "landmarks" onto a canvas
+const drawPose = (canvas, landmarks) => {
+  const ctx = canvas.getContext('2d');
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  if (!landmarks || !landmarks.points) return;
+
+  const { points, connections } = landmarks;
+  const visible = (p) => p && p[2] >= VISIBILITY_THRESHOLD;
+
+  ctx.strokeStyle = BONE_COLOR;
+  ctx.lineWidth = 3;
+  ctx.beginPath();
+  connections.forEach(([start, end]) => {
+    if (visible(points[start]) && visible(points[end])) {
+      ctx.moveTo(points[start][0] * canvas.width, points[start][1] * canvas.height);
+      ctx.lineTo(points[end][0] * canvas.width, points[end][1] * canvas.height);
+    }
+  });
+  ctx.stroke();
+
+  ctx.fillStyle = JOINT_COLOR;
+  points.forEach((p) => {
+    if (!visible(p)) return;
+    ctx.beginPath();
+    ctx.arc(p[0] * canvas.width, p[1] * canvas.height, 6, 0, 2 * Math.PI);
+    ctx.fill();
+  });
+};
+
 const EXERCISES = [
   { id: 'pushup', name: 'Push-ups', icon: '💪', calories: 0.35 },
   { id: 'squat', name: 'Squats', icon: '🦵', calories: 0.32 },
-  { id: 'situp', name: 'Sit-ups', icon: '🏋️', calories: 0.25 }
+  { id: 'situp', name: 'Sit-ups', icon: '🏋️', calories: 0.25 },
+  { id: 'lunge', name: 'Lunges', icon: '🚶', calories: 0.3 }
 ];
 
 const Workout = () => {
   const webcamRef = useRef(null);
+  const overlayRef = useRef(null);
   const [selectedExercise, setSelectedExercise] = useState('pushup');
   const [isActive, setIsActive] = useState(false);
   const [count, setCount] = useState(0);
@@ -27,10 +69,35 @@ const Workout = () => {
   const [saving, setSaving] = useState(false);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
-  const [annotatedImage, setAnnotatedImage] = useState('');
+  const [poseLandmarks, setPoseLandmarks] = useState(null);
+  const [captureFps, setCaptureFps] = useState(DEFAULT_FPS);
   const [debugAngles, setDebugAngles] = useState({ elbow: null, body: null, postureOk: null });
   const intervalRef = useRef(null);
   const timerRef = useRef(null);
+  const streamRef = useRef(null);
+  const inFlightRef = useRef(false);
+
+  // Apply a detection state returned by the CV service
+  const applyResult = useCallback((result) => {
+    setCount(result.count || 0);
+    setStage(result.stage);
+    setFeedback(result.form_feedback || []);
+    setCalories(result.calories_burned || 0);
+    if (result.landmarks) {
+      setPoseLandmarks(result.landmarks.points ? result.landmarks : null);
+    }
+    // The server lowers this when it is overloaded and raises it again later
+    if (result.quality && result.quality.recommended_fps) {
+      setCaptureFps(result.quality.recommended_fps);
+    }
+    if (result.elbow_angle !== undefined || result.body_angle !== undefined) {
+      setDebugAngles({
+        elbow: result.elbow_angle,
+        body: result.body_angle,
+        postureOk: result.posture_ok
+      });
+    }
+  }, []);
 
   // Capture and send frame to CV service
   const captureFrame = useCallback(async () => {
@@ -40,32 +107,57 @@ const Workout = () => {
       const imageSrc = webcamRef.current.getScreenshot();
       if (!imageSrc) return;
 
-      const result = await cvAPI.detect(imageSrc, selectedExercise, sessionIdRef.current, true);
-      
-      setCount(result.count || 0);
-      setStage(result.stage);
-      setFeedback(result.form_feedback || []);
-      setCalories(result.calories_burned || 0);
-      if (result.annotated_image) {
-        setAnnotatedImage(result.annotated_image);
+      if (streamRef.current) {
+        await streamRef.current.sendFrame(imageSrc);
+        return;
       }
-      if (result.elbow_angle !== undefined || result.body_angle !== undefined) {
-        setDebugAngles({
-          elbow: result.elbow_angle,
-          body: result.body_angle,
-          postureOk: result.posture_ok
-        });
+
+      // Skip this tick if the previous request has not come back yet
+      if (inFlightRef.current) return;
+      inFlightRef.current = true;
+      try {
+        const result = await cvAPI.detect(imageSrc, selectedExercise, sessionIdRef.current, 'landmarks');
+        applyResult(result);
+      } finally {
+        inFlightRef.current = false;
       }
     } catch (err) {
       console.error('Detection error:', err);
     }
-  }, [isActive, selectedExercise]);
+  }, [isActive, selectedExercise, applyResult]);
+
+  // Draw the skeleton over the live feed whenever new landmarks arrive
+  useEffect(() => {
+    const canvas = overlayRef.current;
+    if (!canvas) return;
+    const video = webcamRef.current && webcamRef.current.video;
+    if (video && video.videoWidth && canvas.width !== video.videoWidth) {
+      canvas.width = video.videoWidth;
+      canvas.height = video.videoHeight;
+    }
+    drawPose(canvas, isActive ? poseLandmarks : null);
+  }, [poseLandmarks, isActive]);
+
+  // Open a streaming session for the duration of the workout
+  useEffect(() => {
+    if (!USE_STREAMING || !isActive) return undefined;
+
+    streamRef.current = cvAPI.openStream(selectedExercise, sessionIdRef.current, {
+      onState: applyResult,
+      onError: (err) => console.error('Stream error:', err)
+    });
+
+    return () => {
+      if (streamRef.current) streamRef.current.close();
+      streamRef.current = null;
+    };
+  }, [isActive, selectedExercise, applyResult]);
 
   // Start/stop workout
   useEffect(() => {
     if (isActive) {
-      // Capture frames every 100ms (~10 FPS) for smoother counting
-      intervalRef.current = setInterval(captureFrame, 100);
+      // Capture frames at the server's recommended rate (10 FPS by default)
+      intervalRef.current = setInterval(captureFrame, 1000 / captureFps);
       
       // Timer for duration
       timerRef.current = setInterval(() => {
@@ -80,7 +172,7 @@ const Workout = () => {
       if (intervalRef.current) clearInterval(intervalRef.current);
       if (timerRef.current) clearInterval(timerRef.current);
     };
-  }, [isActive, captureFrame]);
+  }, [isActive, captureFrame, captureFps]);
 
   // Cleanup session on unmount
   useEffect(() => {
@@ -109,7 +201,8 @@ const Workout = () => {
     setFeedback([]);
     setCalories(0);
     setDuration(0);
-    setAnnotatedImage('');
+    setPoseLandmarks(null);
+    setCaptureFps(DEFAULT_FPS);
     setDebugAngles({ elbow: null, body: null, postureOk: null });
     setIsActive(true);
   };
@@ -152,7 +245,7 @@ const Workout = () => {
       setFeedback([]);
       setCalories(0);
       setDuration(0);
-      setAnnotatedImage('');
+      setPoseLandmarks(null);
       setDebugAngles({ elbow: null, body: null, postureOk: null });
     } catch (err) {
       console.error('Save error:', err);
@@ -208,17 +301,16 @@ const Workout = () => {
                   height: 480,
                   facingMode: "user"
                 }}
-                className={isActive && annotatedImage ? "camera-feed-hidden" : "camera-feed"}
+                className="camera-feed"
               />
               
-              {/* Show annotated image overlay when available and active */}
-              {isActive && annotatedImage && (
-                <img 
-                  src={annotatedImage} 
-                  alt="Pose detection" 
-                  className="camera-feed annotated"
-                />
-              )}
+              {/* Skeleton drawn client-side from the returned landmarks */}
+              <canvas
+                ref={overlayRef}
+                width={640}
+                height={480}
+                className="camera-feed annotated"
+              />
               
               {/* Overlay Stats */}
               <div className="camera-overlay">
@@ -252,8 +344,8 @@ const Workout = () => {
             
             {/* Toggle for showing skeleton overlay */}
             <div className="view-toggle">
-              <span className={!annotatedImage || !isActive ? 'active' : ''}>📷 Live</span>
-              <span className={annotatedImage && isActive ? 'active' : ''}>🦴 Skeleton</span>
+              <span className={!poseLandmarks || !isActive ? 'active' : ''}>📷 Live</span>
+              <span className={poseLandmarks && isActive ? 'active' : ''}>🦴 Skeleton</span>
             </div>
           </div>
 
@@ -8,6 +8,7 @@ import { auth } from '../config/firebase';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:3000/api';
 const CV_SERVICE_URL = process.env.REACT_APP_CV_SERVICE_URL || 'http://localhost:5000/api';
+const CV_STREAM_URL = process.env.REACT_APP_CV_STREAM_URL || `${CV_SERVICE_URL.replace(/^http/, 'ws')}/stream`;
 
 // Create axios instance
 const api = axios.create({
@@ -39,6 +40,12 @@ const cvApi = axios.create({
   }
 });
 
+// Convert a data URL (e.g. from react-webcam getScreenshot) to a Blob
+const dataUrlToBlob = async (dataUrl) => {
+  const response = await fetch(dataUrl);
+  return response.blob();
+};
+
 // Auth API
 export const authAPI = {
   register: async (email, password, username) => {
@@ -87,16 +94,100 @@ export const workoutAPI = {
 
 // CV Service API
 export const cvAPI = {
-  detect: async (imageData, exerciseType, sessionId = 'default', returnImage = true) => {
+  // outputMode: 'none', 'landmarks' (points + connections to draw on the
+  // client) or 'jpeg' (server-rendered annotated_image data URL).
+  // Pass { binary: true } to upload the frame as a raw image body instead of
+  // base64 JSON. imageData may be a data URL or a Blob.
+  detect: async (imageData, exerciseType, sessionId = 'default', outputMode = 'landmarks', options = {}) => {
+    if (options.binary) {
+      const blob = imageData instanceof Blob ? imageData : await dataUrlToBlob(imageData);
+      const response = await cvApi.post('/detect', blob, {
+        headers: { 'Content-Type': blob.type || 'image/jpeg' },
+        params: {
+          exercise_type: exerciseType,
+          session_id: sessionId,
+          output_mode: outputMode,
+          timestamp: Date.now()
+        }
+      });
+      return response.data;
+    }
+
     const response = await cvApi.post('/detect', {
       image: imageData,
       exercise_type: exerciseType,
       session_id: sessionId,
-      return_image: returnImage
+      output_mode: outputMode,
+      // Capture time, for timestamp-aware rep counting
+      timestamp: Date.now()
     });
     return response.data;
   },
   
+  // Open a WebSocket streaming session. Frames go out as binary messages and
+  // onState is called with every processed state. The server only keeps the
+  // newest pending frame, so sendFrame never builds up a backlog.
+  openStream: (exerciseType, sessionId = 'default', { onState, onError, outputMode = 'landmarks' } = {}) => {
+    const socket = new WebSocket(CV_STREAM_URL);
+
+    socket.onopen = () => {
+      socket.send(JSON.stringify({
+        exercise_type: exerciseType,
+        session_id: sessionId,
+        output_mode: outputMode
+      }));
+    };
+    socket.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.error) {
+        if (onError) onError(data);
+      } else if (onState) {
+        onState(data);
+      }
+    };
+    socket.onerror = (event) => {
+      if (onError) onError(event);
+    };
+
+    return {
+      sendFrame: async (imageData) => {
+        if (socket.readyState !== WebSocket.OPEN) return false;
+        const blob = imageData instanceof Blob ? imageData : await dataUrlToBlob(imageData);
+        socket.send(blob);
+        return true;
+      },
+      reset: () => {
+        if (socket.readyState === WebSocket.OPEN) {
+          socket.send(JSON.stringify({ action: 'reset' }));
+        }
+      },
+      close: () => socket.close()
+    };
+  },
+
+  // Send several buffered frames of one session in a single request.
+  // frames: [{ image: dataUrl, timestamp: ms }, ...] in capture order.
+  detectBatch: async (frames, exerciseType, sessionId = 'default', outputMode = 'none') => {
+    const response = await cvApi.post('/detect_batch', {
+      frames,
+      exercise_type: exerciseType,
+      session_id: sessionId,
+      output_mode: outputMode
+    });
+    return response.data;
+  },
+
+  // Send pose landmarks computed on-device (33 x [x, y, visibility]).
+  // Pass an array of frames to submit a batch.
+  detectLandmarks: async (landmarks, exerciseType, sessionId = 'default', { batch = false } = {}) => {
+    const response = await cvApi.post('/landmarks', {
+      [batch ? 'frames' : 'landmarks']: landmarks,
+      exercise_type: exerciseType,
+      session_id: sessionId
+    });
+    return response.data;
+  },
+
   reset: async (exerciseType, sessionId = 'default') => {
     const response = await cvApi.post('/reset', {
       exercise_type: exerciseType,